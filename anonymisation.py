@@ -0,0 +1,110 @@
+'''
+This Py file is responsible for anonymising personal data in log data.
+All anonymisation rules are compiled into a single regular expression, so a chat, a DataFrame column or a whole CSV file is anonymised in one pass.
+One class and one method are defined below, with their purposes described in comments.
+Run as a script to re-anonymise existing CSV files in place, e.g. python anonymisation.py "../Intermediate Log Data/logsAll.csv"
+'''
+
+import os
+import sys
+import csv
+import re
+
+
+# Anonymisation rules as (name, pattern, replacement), in order of precedence
+# Patterns must not contain capturing groups
+# 'abc@xyz.com' and '9XXXXXXXXX' are relied upon by finalise_segregation and doubt_resolver
+rules = [
+	('email', r'[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+', 'abc@xyz.com'),
+	('ip', r'\b(?:[0-9]{1,3}\.){3}[0-9]{1,3}\b', 'X.X.X.X'),
+	# Mobile numbers with the 91 country code would otherwise be taken for Aadhaar numbers
+	('phone_country', r'\+?\b91[6-9][0-9]{9}\b', '9XXXXXXXXX'),
+	('aadhaar', r'\b[2-9][0-9]{3}[ -]?[0-9]{4}[ -]?[0-9]{4}\b', 'XXXXXXXXXXXX'),
+	('pan', r'\b[A-Z]{5}[0-9]{4}[A-Z]\b', 'XXXXX0000X'),
+	('phone', r'[0-9]{10}', '9XXXXXXXXX'),
+]
+
+
+# Class for anonymising text with a set of rules compiled into a single pattern
+class Anonymiser(object):
+
+	# Compiling rules
+	def __init__(self, rules=rules):
+		self.rules = []
+		for name, pattern, replacement in rules:
+			self.add_rule(name, pattern, replacement, compile=False)
+		self.compile()
+
+	# Method to add a rule, which takes precedence over rules added after it
+	def add_rule(self, name, pattern, replacement, compile=True):
+		if re.compile(pattern).groups:
+			raise ValueError('Anonymisation rule %s must not contain capturing groups' % name)
+		self.rules = [rule for rule in self.rules if rule[0] != name] + [(name, pattern, replacement)]
+		if compile:
+			self.compile()
+
+	# Method to combine all rules into one alternation of named groups
+	def compile(self):
+		self.pattern = re.compile('|'.join('(?P<%s>%s)' % (name, pattern) for name, pattern, _ in self.rules))
+		self.replacements = {name: replacement for name, _, replacement in self.rules}
+
+	# Replacement token of the rule that matched
+	def replace(self, match):
+		return self.replacements[match.lastgroup]
+
+	# Method to anonymise a single string, e.g. a whole chat
+	def anonymise(self, text):
+		return self.pattern.sub(self.replace, text)
+
+	# Method to anonymise a pandas Series of strings
+	def anonymise_series(self, series):
+		return series.str.replace(self.pattern, self.replace, regex=True)
+
+	# Method to anonymise columns of a pandas DataFrame
+	def anonymise_frame(self, df, columns=('UserInput', 'Response')):
+		df = df.copy()
+		for column in columns:
+			df[column] = self.anonymise_series(df[column])
+		return df
+
+	# Method to anonymise columns of a CSV file row by row, writing to dst or replacing src
+	def anonymise_csv(self, src, dst=None, columns=('UserInput', 'Response'), batch_size=10000):
+		out = dst if dst is not None else src + '.tmp'
+
+		with open(src, newline='') as fin, open(out, 'w', newline='') as fout:
+			reader = csv.reader(fin)
+			writer = csv.writer(fout)
+			header = next(reader)
+			writer.writerow(header)
+			positions = [header.index(column) for column in columns if column in header]
+
+			batch = []
+			for record in reader:
+				for i in positions:
+					record[i] = self.anonymise(record[i])
+				batch.append(record)
+				if len(batch) >= batch_size:
+					writer.writerows(batch)
+					batch = []
+			writer.writerows(batch)
+
+		if dst is None:
+			os.replace(out, src)
+
+
+# Anonymiser with the default rules
+anonymiser = Anonymiser()
+
+
+# Method to anonymise a single string with the default rules
+def anonymise(text):
+	return anonymiser.anonymise(text)
+
+
+if __name__ == '__main__':
+
+	for file in sys.argv[1:]:
+		print('Anonymising %s...' % file)
+		anonymiser.anonymise_csv(file)
+
+	print('Anonymisation complete.')
@@ -18,6 +18,7 @@ from dash.dependencies import Input, Output
 import pandas as pd
 import dash_bootstrap_components as dbc
 import dash.dependencies as dd
+import schema
 
 # For image transfer
 from io import BytesIO
@@ -32,33 +33,20 @@ app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
 server = app.server
 
 
-# Reading all relevant CSV files and converting the elements in Timestamp field to datetime objects
-complete = pd.read_csv('Intermediate Log Data/AllLogsFinal.csv')
-complete['Timestamp'] = pd.to_datetime(complete['Timestamp'])
+# Reading all relevant log data files, Timestamp fields are read as datetime objects
+complete = schema.read_logs('Intermediate Log Data/AllLogsFinal.csv')
 
-gen = pd.read_csv('Intermediate Log Data/GeneralFinal.csv')
-dom = pd.read_csv('Intermediate Log Data/DomainFinal.csv')
+gen = schema.read_logs('Intermediate Log Data/GeneralFinal.csv')
+dom = schema.read_logs('Intermediate Log Data/DomainFinal.csv')
 
-gen['Timestamp'] = pd.to_datetime(gen['Timestamp'])
-dom['Timestamp'] = pd.to_datetime(dom['Timestamp'])
+gensuc = schema.read_logs('Final Tasks Log Data/GeneralSuccessful.csv')
+genuns = schema.read_logs('Final Tasks Log Data/GeneralUnsuccessful.csv')
 
-gensuc = pd.read_csv('Final Tasks Log Data/GeneralSuccessful.csv')
-genuns = pd.read_csv('Final Tasks Log Data/GeneralUnsuccessful.csv')
+domsuc = schema.read_logs('Intermediate Log Data/DomainSuccessful.csv')
+domuns = schema.read_logs('Final Tasks Log Data/FilteredDomainUnsuccess.csv')
 
-gensuc['Timestamp'] = pd.to_datetime(gensuc['Timestamp'])
-genuns['Timestamp'] = pd.to_datetime(genuns['Timestamp'])
-
-domsuc = pd.read_csv('Intermediate Log Data/DomainSuccessful.csv')
-domuns = pd.read_csv('Final Tasks Log Data/FilteredDomainUnsuccess.csv')
-
-domsuc['Timestamp'] = pd.to_datetime(domsuc['Timestamp'])
-domuns['Timestamp'] = pd.to_datetime(domuns['Timestamp'])
-
-task3 = pd.read_csv('Final Tasks Log Data/FilteredTask3.csv')
-task4 = pd.read_csv('Intermediate Log Data/Task3Neg.csv')
-
-task3['Timestamp2'] = pd.to_datetime(task3['Timestamp2'])
-task4['Timestamp2'] = pd.to_datetime(task4['Timestamp2'])
+task3 = schema.read_logs('Final Tasks Log Data/FilteredTask3.csv')
+task4 = schema.read_logs('Intermediate Log Data/Task3Neg.csv')
 
 
 '''
@@ -372,7 +360,7 @@ def complete_intent(start_date, end_date):
 
     # Getting 10 most frequent intent names
     n = 10
-    complete_intent = dict(complete_trim['IntentName'].value_counts()[:n])
+    complete_intent = dict(complete_trim['IntentName'].value_counts().loc[lambda x: x > 0][:n])
 
     fig = go.Figure(go.Bar(
     x=list(complete_intent.values()), 
@@ -406,7 +394,7 @@ def complete_event(start_date, end_date):
     complete_trim = complete[(complete.Timestamp >= start_date) & (complete.Timestamp <= end_date)]
 
     n = 10
-    complete_event = dict(complete_trim['Event'].value_counts()[:n])
+    complete_event = dict(complete_trim['Event'].value_counts().loc[lambda x: x > 0][:n])
     colors = ['gold', 'mediumturquoise', 'darkorange', 'lightgreen']
 
     fig = go.Figure(go.Pie(
@@ -434,7 +422,7 @@ def gen_intent(start_date, end_date):
     gen_trim = gen[(gen.Timestamp >= start_date) & (gen.Timestamp <= end_date)]
 
     n = 10
-    gen_intent = dict(gen_trim['IntentName'].value_counts()[:n])
+    gen_intent = dict(gen_trim['IntentName'].value_counts().loc[lambda x: x > 0][:n])
 
     fig = go.Figure(go.Bar(
     x=list(gen_intent.values()), 
@@ -468,7 +456,7 @@ def gen_event(start_date, end_date):
     gen_trim = gen[(gen.Timestamp >= start_date) & (gen.Timestamp <= end_date)]
 
     n = 10
-    gen_event = dict(gen_trim['Event'].value_counts()[:n])
+    gen_event = dict(gen_trim['Event'].value_counts().loc[lambda x: x > 0][:n])
     colors = ['gold', 'mediumturquoise', 'darkorange', 'lightgreen']
 
     fig = go.Figure(go.Pie(
@@ -554,7 +542,7 @@ def dom_intent(start_date, end_date):
     dom_trim = dom[(dom.Timestamp >= start_date) & (dom.Timestamp <= end_date)]
 
     n = 10
-    dom_intent = dict(dom_trim['IntentName'].value_counts()[:n])
+    dom_intent = dict(dom_trim['IntentName'].value_counts().loc[lambda x: x > 0][:n])
 
     fig = go.Figure(go.Bar(
     x=list(dom_intent.values()), 
@@ -588,7 +576,7 @@ def dom_event(start_date, end_date):
     dom_trim = dom[(dom.Timestamp >= start_date) & (dom.Timestamp <= end_date)]
 
     n = 10
-    dom_event = dict(dom_trim['Event'].value_counts()[:n])
+    dom_event = dict(dom_trim['Event'].value_counts().loc[lambda x: x > 0][:n])
     colors = ['gold', 'mediumturquoise', 'darkorange', 'lightgreen']
 
     fig = go.Figure(go.Pie(
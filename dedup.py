@@ -0,0 +1,128 @@
+'''
+This Py file is responsible for removing duplicate query/response records, i.e. records with the same contents.
+Records are compared by a 64-bit fingerprint of their contents instead of by all of their fields.
+Duplicates are removed once, when log data is extracted, in one of two modes chosen by the DEDUP_MODE environment variable:
+	1. exact - Fingerprints of all records seen so far are kept in memory
+	2. bloom - Fingerprints are added to a Bloom filter of fixed size, which uses bounded memory however many records are extracted,
+	   at the cost of taking up to a fraction bloom_error_rate of unique records for duplicates once bloom_capacity records have been seen
+Which of duplicate records is kept is chosen by the DEDUP_KEEP environment variable:
+	1. first - Records are streamed in order and every duplicate of an earlier record is dropped as it is seen
+	2. last or none - The last of duplicate records, or whether a record has duplicates at all, is only known once all records are seen,
+	   so records are read twice, and only in exact mode since a Bloom filter cannot tell which records a fingerprint came from
+Three classes and one method are defined below, with their purposes described in comments.
+'''
+
+import os
+import math
+import hashlib
+
+
+# Deduplication mode of extraction, 'exact' or 'bloom'
+mode = os.environ.get('DEDUP_MODE', 'exact').lower()
+
+# Sizing of the Bloom filter
+bloom_capacity = 10000000 		# Number of records the filter is sized for
+bloom_error_rate = 0.001 		# Probability of a unique record being taken for a duplicate at capacity
+
+# Which of duplicate records is kept, 'first', 'last' or 'none'
+keep = os.environ.get('DEDUP_KEEP', 'first').lower()
+
+
+# Method to get the fingerprint of a record given as a sequence of field values
+def fingerprint(fields):
+
+	digest = hashlib.blake2b('\x1f'.join('' if value is None else str(value) for value in fields).encode('utf-8'), digest_size=8).digest()
+
+	return int.from_bytes(digest, 'big')
+
+
+# Class for remembering fingerprints exactly
+class ExactFilter(object):
+
+	def __init__(self):
+		self.fingerprints = set()
+
+	# Method to check whether a fingerprint was seen before, remembering it
+	def seen(self, fingerprint):
+		if fingerprint in self.fingerprints:
+			return True
+		self.fingerprints.add(fingerprint)
+		return False
+
+
+# Class for remembering fingerprints in a Bloom filter of fixed size
+class BloomFilter(object):
+
+	def __init__(self, capacity=bloom_capacity, error_rate=bloom_error_rate):
+		self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+		self.hashes = max(1, round(self.size / capacity * math.log(2)))
+		self.bits = bytearray((self.size + 7) // 8)
+
+	# Method to check whether a fingerprint was probably seen before, remembering it
+	# Bit positions are derived from the two halves of the fingerprint by double hashing
+	def seen(self, fingerprint):
+		first, second = fingerprint & 0xffffffff, (fingerprint >> 32) | 1
+		seen = True
+		for i in range(self.hashes):
+			position = (first + i * second) % self.size
+			if not self.bits[position >> 3] & (1 << (position & 7)):
+				seen = False
+				self.bits[position >> 3] |= 1 << (position & 7)
+		return seen
+
+
+# Class for dropping duplicates from records, keeping the first or last of them, or none of them
+class Deduplicator(object):
+
+	# fields are the positions of the fields making up the contents of a record
+	def __init__(self, fields, mode=mode, keep=keep):
+		if mode not in ('exact', 'bloom'):
+			raise ValueError('Unknown deduplication mode %s, expected exact or bloom' % mode)
+		if keep not in ('first', 'last', 'none'):
+			raise ValueError('Unknown deduplication keep %s, expected first, last or none' % keep)
+		if keep != 'first' and mode == 'bloom':
+			raise ValueError('Deduplication keep %s needs exact mode' % keep)
+		self.fields = fields
+		self.keep = keep
+		self.filter = BloomFilter() if mode == 'bloom' else ExactFilter()
+		self.dropped = 0
+
+	# Method to get the fingerprint of the contents of a record
+	def fingerprint(self, record):
+		return fingerprint([record[i] for i in self.fields])
+
+	# Method to check whether a record duplicates an earlier one, remembering it, when the first of duplicates is kept
+	def is_duplicate(self, record):
+		duplicate = self.filter.seen(self.fingerprint(record))
+		self.dropped += duplicate
+		return duplicate
+
+	# Method to get the positions of the records to keep when the last of duplicates or none of them is kept
+	# Every fingerprint is mapped to the position of its last record, or to -1 once a second record has it and none is kept
+	def kept_positions(self, records):
+		positions = {}
+		count = 0
+		for position, record in enumerate(records):
+			key = self.fingerprint(record)
+			positions[key] = -1 if self.keep == 'none' and key in positions else position
+			count += 1
+
+		kept = set(positions.values())
+		kept.discard(-1)
+		self.dropped += count - len(kept)
+		return kept
+
+	# Generator yielding records which do not duplicate others, records being read twice unless the first of duplicates is kept
+	def unique(self, records):
+		if self.keep == 'first':
+			for record in records:
+				if not self.is_duplicate(record):
+					yield record
+			return
+
+		records = list(records)
+		kept = self.kept_positions(records)
+		for position, record in enumerate(records):
+			if position in kept:
+				yield record
+
@@ -3,79 +3,210 @@ Author: Varun Chopra
 Date: 04-06-2020
 
 This Py file is responsible for performing dictionary check on log data and retaining only those queries which contain at least one meaningful word.
-Dictionary check is performed through Wiktionary API. 
-Since performing an API GET request for every word in each query would take a lot of time, multiprocessing has been employed to speed up this task.
-Four methods are defined below, with their purposes described in comments.
+Dictionary check is performed through Wiktionary API, or through a local word list when the DICTIONARY_BACKEND environment variable is set to 'wordlist' (see dictionary_backend.py).
+By default, every distinct word of the log data is looked up only once through batched asynchronous Wiktionary API requests and the verdicts are joined back to the queries (DICTIONARY_MODE=vocabulary).
+Setting DICTIONARY_MODE to 'row' checks the queries row by row in different processes instead, since performing an API GET request for every word in each query would take a lot of time.
+Completed chunks are checkpointed to dictCheckpoint.jsonl as the check goes, and a restarted check resumes from the last checkpoint.
+One class and eight methods are defined below, with their purposes described in comments.
 Logs passing the dictionary check are stored in a newly created file, logsAllDict.csv.
 Discarded logs are stored in DictTrash.csv.
 '''
 
-import pandas as pd
-import requests
+import os
+import math
+import json
+import hashlib
 import numpy as np
-import multiprocessing
-from multiprocessing import Pool, Process
+from multiprocessing import Pool
 import re
+import schema
+import dictionary_backend
 
 
 # Method to read pandas dataframe
 def read_data(file):
-	data = pd.read_csv(file)
+	data = schema.read_logs(file)
 	return data
 
 # Multiprocessing
-num_partitions = 8 		# Number of partitions to split dataframe
-num_cores = 8 			# Number of cores on your machine
+num_cores = os.cpu_count() 		# Number of cores on your machine
+chunk_rows = 500 			# Maximum number of rows in a chunk handed to a process
+
+# Dictionary backend used to decide whether a word is meaningful, with remote verdicts cached on disk
+cache = dictionary_backend.VerdictCache()
+backend = dictionary_backend.get_backend(os.environ.get('DICTIONARY_BACKEND', 'wiktionary-async'), cache=cache)
+
+# Dictionary check mode, 'vocabulary' or 'row'
+check_mode = os.environ.get('DICTIONARY_MODE', 'vocabulary')
+
+# Checkpoint of completed chunks
+checkpoint_path = '../Intermediate Log Data/dictCheckpoint.jsonl'
+vocabulary_chunk = 5000 		# Number of distinct words looked up between checkpoints
+
+
+# Class for checkpointing verdicts of completed chunks, identified by their start and end positions
+# A checkpoint only applies to the run it was written for, identified by key
+class Checkpoint(object):
+
+	# Loading completed chunks of an earlier run with the same key
+	def __init__(self, path, key):
+		self.path = path
+		self.key = key
+		self.done = {}
+
+		if os.path.exists(path):
+			with open(path) as f:
+				lines = f.read().splitlines()
+			if lines and json.loads(lines[0]) == {'key': key}:
+				for line in lines[1:]:
+					# A crash may leave the last line partially written
+					try:
+						entry = json.loads(line)
+					except ValueError:
+						break
+					self.done[(entry['start'], entry['end'])] = entry['verdicts']
+
+		# Rewriting checkpoint file with completed chunks only, or starting a new one for a different run
+		with open(path, 'w') as f:
+			f.write(json.dumps({'key': key}) + '\n')
+			for (start, end), verdicts in self.done.items():
+				f.write(json.dumps({'start': start, 'end': end, 'verdicts': verdicts}) + '\n')
+
+	# Method to get verdicts of a completed chunk as a boolean array, or None
+	def get(self, start, end):
+		verdicts = self.done.get((start, end))
+		if verdicts is None:
+			return None
+		return np.array([v == '1' for v in verdicts], dtype=bool)
+
+	# Method to record verdicts of a completed chunk
+	def save(self, start, end, verdicts):
+		verdicts = ''.join('1' if v else '0' for v in verdicts)
+		self.done[(start, end)] = verdicts
+		with open(self.path, 'a') as f:
+			f.write(json.dumps({'start': start, 'end': end, 'verdicts': verdicts}) + '\n')
+			f.flush()
+			os.fsync(f.fileno())
+
+	# Method to delete checkpoint once the check has completed
+	def remove(self):
+		if os.path.exists(self.path):
+			os.remove(self.path)
+
+
+# Method to get key identifying a dictionary check run over the given queries
+def checkpoint_key(queries):
+
+	digest = hashlib.sha1()
+	for query in queries:
+		digest.update(query.encode('utf-8', 'replace') + b'\0')
+
+	return '%s:%s:%s' % (check_mode, os.environ.get('DICTIONARY_BACKEND', 'wiktionary-async'), digest.hexdigest())
+
+
+# Method to split the queries into small chunks and assign the task of dictionary checking them to different processes
+# Processes pick up the next chunk as soon as they are done, so slow chunks do not hold up idle processes
+# Chunks completed in an earlier run are taken from the checkpoint, and every newly completed chunk is checkpointed
+# Returns a boolean mask of rows with at least one meaningful word
+def parallelize_dataframe(df, func, checkpoint=None):
 
+	# Only the queries are sent to the processes
+	queries = df['UserInput'].astype(str).tolist()
+	keep = np.zeros(len(queries), dtype=bool)
 
-# Method to split dataframe into chunks and assign the task of dictionary checking them to different processes
-def parallelize_dataframe(df, func):
+	# Split queries into at least four chunks per process, of at most chunk_rows rows each
+	chunk_size = max(1, min(chunk_rows, math.ceil(len(queries) / (num_cores * 4))))
+	chunks = []
+	for start in range(0, len(queries), chunk_size):
+		end = min(start + chunk_size, len(queries))
+		verdicts = checkpoint.get(start, end) if checkpoint is not None else None
+		if verdicts is not None:
+			keep[start:end] = verdicts
+		else:
+			chunks.append((func, start, queries[start:end]))
 
-	# Split dataframe into chunks
-	df_split = np.array_split(df, num_partitions)
-	# Use Pool from Py microprocessing library
-	pool = Pool(num_cores)
-	df = pd.concat(pool.map(func, df_split))
-	pool.close()
-	pool.join()
+	if checkpoint is not None and checkpoint.done:
+		print('Resuming from checkpoint, %d chunks left...' % len(chunks))
+	if not chunks:
+		return keep
 
-	return df
+	# Use Pool from Py multiprocessing library
+	with Pool(min(num_cores, len(chunks))) as pool:
+		for start, verdicts, counts in pool.imap_unordered(check_chunk, chunks):
+			keep[start:start + len(verdicts)] = verdicts
+			# Word verdict cache hits and misses of the process
+			cache.add_counts(counts)
+			if checkpoint is not None:
+				checkpoint.save(start, start + len(verdicts), verdicts)
 
+	return keep
 
-# Method to perform dictionary check on a chunk of data using Wiktionary API
-def dictionary_check(chunk):
 
-	# Using global dataframe to ensure no overwiting occurs
-	global df 				
+# Method to run dictionary check on a single chunk in a process, returning its start position with its verdicts
+# and the word verdict cache hits and misses of the chunk
+def check_chunk(chunk):
+
+	func, start, queries = chunk
+	verdicts = func(queries)
+
+	return start, verdicts, cache.take_counts()
 
-	for index, row in chunk.iterrows():
-		# Get query from UserInput field
-		query = str(row['UserInput'])
-		# Removing special characters
-		query = re.sub(r"[^a-zA-Z0-9]+", ' ', query)
-		# Split query with whitespace delimiter
-		words = str(query).split()
 
-		for word in words:
-			# Wiktionary API GET request
-			response = requests.get('https://en.wiktionary.org/w/api.php?action=query&titles=' + word.lower() + '&format=json')
-			resData = response.json()
+# Method to perform dictionary check on a chunk of queries using the dictionary backend
+# The distinct words of the chunk are looked up in a single call to the backend
+# Returns a boolean mask of queries with at least one meaningful word
+def dictionary_check(queries):
 
-			# Write queries with even one meaningful word to global dataframe
-			if list(resData['query']['pages'].keys())[0] != '-1':
-				df = df.append(row)
-				break
+	# Removing special characters and splitting with whitespace delimiter
+	words = [re.sub(r"[^a-zA-Z0-9]+", ' ', query).lower().split() for query in queries]
+	verdicts = backend.lookup(set(word for query in words for word in query))
 
-	return df
+	# Keep queries with even one meaningful word
+	return np.array([any(verdicts[word] for word in query) for query in words], dtype=bool)
 
 
-# Method to store discarded logs
-def discarded(data):
+# Method to split the query of every row into lowercase words in one vectorised pass
+# Returns a series with one word per entry, indexed by the position of its row
+def tokenize(data):
 
-	dataCleaned = pd.read_csv('../Intermediate Log Data/logsAllDict.csv')
-	dataRemoved = data.merge(dataCleaned, how = 'outer' ,indicator=True).loc[lambda x : x['_merge']=='left_only']
-	dataRemoved = dataRemoved.drop('_merge',axis=1)
-	dataRemoved.to_csv('../Intermediate Log Data/DictTrash.csv', index=False)
+	queries = data['UserInput'].astype(str).reset_index(drop=True)
+	# Removing special characters and splitting with whitespace delimiter
+	words = queries.str.replace(r'[^a-zA-Z0-9]+', ' ', regex=True).str.lower().str.split()
+
+	return words.explode()
+
+
+# Method to perform dictionary check by looking up every distinct word once
+# Words are looked up in chunks, which are checkpointed as they complete
+# Returns a boolean mask of rows with at least one meaningful word
+def vocabulary_check(data, checkpoint=None):
+
+	words = tokenize(data)
+	vocabulary = words.dropna().unique()
+	print('Looking up %d distinct words out of %d...' % (len(vocabulary), words.count()))
+
+	verdicts = {}
+	for start in range(0, len(vocabulary), vocabulary_chunk):
+		end = min(start + vocabulary_chunk, len(vocabulary))
+		chunk = vocabulary[start:end]
+		found = checkpoint.get(start, end) if checkpoint is not None else None
+		if found is None:
+			lookup = backend.lookup(chunk)
+			found = [lookup[word] for word in chunk]
+			if checkpoint is not None:
+				checkpoint.save(start, end, found)
+		verdicts.update(zip(chunk, found))
+
+	meaningful = words.map(verdicts).fillna(False).astype(bool)
+
+	return meaningful.groupby(level=0).any().to_numpy()
+
+
+# Method to store discarded logs, the rows left out by the dictionary check mask
+def discarded(data, keep):
+
+	dataRemoved = data[~keep]
+	schema.write_logs(dataRemoved, '../Intermediate Log Data/DictTrash.csv')
 
 
 if __name__ == '__main__':
@@ -84,19 +215,31 @@ if __name__ == '__main__':
 	# Get log data in a dataframe
 	data = read_data(file)
 
-	# Creating new global dataframe
-	df = pd.DataFrame(columns=['SessionID', 'Timestamp', 'IntentName','Event','UserInput','Response'])
-
 	print('Performing dictionary check on log data...')
-
-	# Calling dictionary_check method through different processes on different chunks of data
-	dataDict = parallelize_dataframe(data, dictionary_check)
+	if backend.remote:
+		cache.reset_stats()
+
+	# Resuming from checkpoint of an interrupted run over the same log data
+	checkpoint = Checkpoint(checkpoint_path, checkpoint_key(data['UserInput'].astype(str)))
+
+	if check_mode == 'vocabulary':
+		# Calling vocabulary_check method on the whole log data
+		keep = vocabulary_check(data, checkpoint)
+	else:
+		# Calling dictionary_check method through different processes on different chunks of data
+		keep = parallelize_dataframe(data, dictionary_check, checkpoint)
+	dataDict = data[keep]
 	# Writing datafram to csv file
-	dataDict.to_csv('../Intermediate Log Data/logsAllDict.csv', index=False)
-	dataDict.to_csv('../To Index/logsAllDict.csv', index=False)
+	schema.write_logs(dataDict, '../Intermediate Log Data/logsAllDict.csv')
 	print('Dictionary check complete. Valid data stored in logsAllDict.csv')
+	if backend.remote:
+		cache.save_stats()
+		stats = cache.stats()
+		print('Word verdict cache: %d hits, %d misses' % (stats['hits'], stats['misses']))
 
 	# Calling discarded method
-	discarded(data)
+	discarded(data, keep)
 	print('Discarded logs stored in DictTrash.csv')
 
+	checkpoint.remove()
+
@@ -0,0 +1,302 @@
+'''
+This Py file is responsible for deciding whether a word is meaningful, for the dictionary check performed in dictionary.py.
+The following backends are defined below, with their purposes described in comments:
+	1. wiktionary - Wiktionary API GET request for every word
+	2. wiktionary-async - Asynchronous Wiktionary API client, looking up to 50 words per request over pooled connections
+	3. wordlist - Lookup in a local word list which is loaded into memory once, requiring no network access
+The backend is chosen by name through get_backend method.
+Verdicts of remote backends are cached in a SQLite database shared by all processes of the dictionary check and kept between runs.
+'''
+
+import os
+import time
+import sqlite3
+import asyncio
+import requests
+
+
+# Wiktionary API endpoint, which can be pointed at a local stand-in server
+wiktionary_url = os.environ.get('WIKTIONARY_URL', 'https://en.wiktionary.org/w/api.php')
+
+# Local word list used by the wordlist backend, one word per line
+word_list = os.environ.get('DICTIONARY_WORDLIST', '../words.txt')
+
+# Persistent cache of word verdicts
+cache_path = os.environ.get('DICTIONARY_CACHE', '../Intermediate Log Data/wordCache.sqlite')
+cache_ttl = 30 * 24 * 60 * 60 		# Seconds after which a cached verdict is checked again
+cache_size = 1000000 			# Maximum number of cached verdicts
+
+
+# Base class of dictionary backends
+class DictionaryBackend(object):
+
+	# Whether lookups leave the process and are worth caching
+	remote = True
+
+	# Method to check whether a single lowercase word is meaningful
+	def is_meaningful(self, word):
+		raise NotImplementedError
+
+	# Method to check many lowercase words at once, returning a dictionary of word to verdict
+	def lookup(self, words):
+		return {word: self.is_meaningful(word) for word in words}
+
+
+# Backend performing a Wiktionary API GET request for every word
+class WiktionaryBackend(DictionaryBackend):
+
+	def __init__(self, url=wiktionary_url):
+		self.url = url
+
+	def is_meaningful(self, word):
+		response = requests.get(self.url, params={'action': 'query', 'titles': word, 'format': 'json'})
+		resData = response.json()
+
+		# Page ID -1 is returned for words without a Wiktionary entry
+		return list(resData['query']['pages'].keys())[0] != '-1'
+
+
+# Backend querying Wiktionary API asynchronously with many titles per request
+# Requests share a pool of keep-alive connections, at most concurrency of them are in flight,
+# and every 429 or 5xx response slows all requests down until the API recovers
+class AsyncWiktionaryBackend(DictionaryBackend):
+
+	def __init__(self, url=wiktionary_url, batch_size=50, concurrency=8, retries=8, max_delay=60.0, timeout=30.0):
+		# aiohttp is only needed by this backend
+		import aiohttp
+		self.aiohttp = aiohttp
+		self.url = url
+		self.batch_size = batch_size 		# MediaWiki API accepts up to 50 titles per request
+		self.concurrency = concurrency
+		self.retries = retries
+		self.max_delay = max_delay
+		self.timeout = timeout 		# Seconds after which a request is given up and retried
+		self.delay = 0.0
+
+	def is_meaningful(self, word):
+		return self.lookup([word])[word]
+
+	def lookup(self, words):
+		words = list(dict.fromkeys(words))
+		if not words:
+			return {}
+		return asyncio.run(self.lookup_async(words))
+
+	# Coroutine looking up all words in batches over a single connection pool
+	async def lookup_async(self, words):
+		semaphore = asyncio.Semaphore(self.concurrency)
+		connector = self.aiohttp.TCPConnector(limit=self.concurrency)
+
+		async with self.aiohttp.ClientSession(connector=connector, timeout=self.aiohttp.ClientTimeout(total=self.timeout)) as session:
+			batches = [words[i:i + self.batch_size] for i in range(0, len(words), self.batch_size)]
+			results = await asyncio.gather(*(self.query(session, semaphore, batch) for batch in batches))
+
+		verdicts = {}
+		for result in results:
+			verdicts.update(result)
+
+		return verdicts
+
+	# Coroutine looking up a batch of words in a single request, retrying throttled and failed requests
+	# 429 and 5xx responses, connection errors and timeouts are retried, so a single failed request does not lose the other batches,
+	# while other 4xx responses would fail again and are raised at once
+	async def query(self, session, semaphore, batch):
+		params = {'action': 'query', 'titles': '|'.join(batch), 'format': 'json', 'formatversion': '2'}
+
+		for attempt in range(self.retries):
+			async with semaphore:
+				# Backing off while holding a connection slot, so waiting requests resume one slot at a time
+				if self.delay:
+					await asyncio.sleep(self.delay)
+
+				try:
+					async with session.get(self.url, params=params) as response:
+						if response.status == 429 or response.status >= 500:
+							self.slow_down(response.headers.get('Retry-After'))
+							continue
+						response.raise_for_status()
+						resData = await response.json(content_type=None)
+				except self.aiohttp.ClientResponseError as error:
+					if 400 <= error.status < 500:
+						raise
+					self.slow_down()
+					continue
+				except (self.aiohttp.ClientError, asyncio.TimeoutError):
+					self.slow_down()
+					continue
+
+			# Recovering speed after successful requests
+			self.delay = self.delay / 2 if self.delay > 0.05 else 0.0
+
+			return self.verdicts(batch, resData)
+
+		raise RuntimeError('Wiktionary API request failed after %d attempts' % self.retries)
+
+	# Method to back off exponentially, or as long as the API asks for
+	def slow_down(self, retry_after=None):
+		delay = max(1.0, self.delay * 2)
+		if retry_after is not None and retry_after.isdigit():
+			delay = max(delay, float(retry_after))
+		self.delay = min(delay, self.max_delay)
+
+	# Method to get verdicts of a batch from an API response
+	def verdicts(self, batch, resData):
+		query = resData.get('query', {})
+
+		# Titles are normalised by the API, e.g. underscores become spaces
+		normalized = {entry['from']: entry['to'] for entry in query.get('normalized', [])}
+		# Words without a Wiktionary entry are returned as missing or invalid pages
+		exists = {page['title']: not (page.get('missing') or page.get('invalid')) for page in query.get('pages', [])}
+
+		return {word: exists.get(normalized.get(word, word), False) for word in batch}
+
+
+# Backend looking words up in a local word list
+class WordListBackend(DictionaryBackend):
+
+	remote = False
+
+	# Loading word list into a set of lowercase words
+	def __init__(self, path=word_list):
+		with open(path, encoding='utf-8') as f:
+			self.words = frozenset(line.strip().lower() for line in f if line.strip())
+
+	def is_meaningful(self, word):
+		return word in self.words
+
+	def lookup(self, words):
+		return {word: word in self.words for word in words}
+
+
+# Class for a persistent word verdict cache, safe to share between processes
+class VerdictCache(object):
+
+	def __init__(self, path=cache_path, ttl=cache_ttl, max_entries=cache_size):
+		self.path = path
+		self.ttl = ttl
+		self.max_entries = max_entries
+		self.connection = None
+		self.pid = None
+		self.writes = 0
+		# Hit and miss counts of this process not yet written to the database
+		self.counts = {'hits': 0, 'misses': 0}
+
+	# Method to get a connection of the current process, since connections cannot be shared across processes
+	def connect(self):
+		if self.connection is None or self.pid != os.getpid():
+			self.connection = sqlite3.connect(self.path, timeout=60)
+			self.pid = os.getpid()
+			self.connection.execute('PRAGMA journal_mode=WAL')
+			with self.connection:
+				self.connection.execute('CREATE TABLE IF NOT EXISTS verdicts (word TEXT PRIMARY KEY, meaningful INTEGER, checked REAL)')
+				self.connection.execute('CREATE INDEX IF NOT EXISTS verdicts_checked ON verdicts (checked)')
+				self.connection.execute('CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER)')
+				self.connection.execute("INSERT OR IGNORE INTO counters VALUES ('hits', 0), ('misses', 0)")
+		return self.connection
+
+	# Method to get cached verdicts which have not expired
+	def get_many(self, words):
+		connection = self.connect()
+		words = list(words)
+		verdicts = {}
+		oldest = time.time() - self.ttl
+
+		# SQLite limits the number of parameters of a statement
+		for i in range(0, len(words), 500):
+			batch = words[i:i + 500]
+			rows = connection.execute('SELECT word, meaningful FROM verdicts WHERE checked >= ? AND word IN (%s)' % ','.join('?' * len(batch)), [oldest] + batch)
+			verdicts.update((word, bool(meaningful)) for word, meaningful in rows)
+
+		self.counts['hits'] += len(verdicts)
+		self.counts['misses'] += len(words) - len(verdicts)
+
+		return verdicts
+
+	# Method to store verdicts, evicting the oldest ones once the cache is full
+	def put_many(self, verdicts):
+		if not verdicts:
+			return
+
+		connection = self.connect()
+		now = time.time()
+		with connection:
+			connection.executemany('INSERT OR REPLACE INTO verdicts VALUES (?, ?, ?)', [(word, int(meaningful), now) for word, meaningful in verdicts.items()])
+
+		self.writes += len(verdicts)
+		if self.writes >= 1000:
+			self.writes = 0
+			self.evict()
+
+	# Method to remove expired verdicts and the oldest verdicts beyond max_entries
+	def evict(self):
+		connection = self.connect()
+		with connection:
+			connection.execute('DELETE FROM verdicts WHERE checked < ?', (time.time() - self.ttl,))
+			excess = connection.execute('SELECT COUNT(*) FROM verdicts').fetchone()[0] - self.max_entries
+			if excess > 0:
+				connection.execute('DELETE FROM verdicts WHERE word IN (SELECT word FROM verdicts ORDER BY checked LIMIT ?)', (excess,))
+
+	# Method to get and clear the hit and miss counts of this process, e.g. to hand them from a worker process to its parent
+	def take_counts(self):
+		counts, self.counts = self.counts, {'hits': 0, 'misses': 0}
+		return counts
+
+	# Method to add hit and miss counts of another process to those of this process
+	def add_counts(self, counts):
+		for name, value in counts.items():
+			self.counts[name] += value
+
+	# Method to add the hit and miss counts of this process to the counters in the database, in a single transaction
+	def save_stats(self):
+		counts = self.take_counts()
+		with self.connect() as connection:
+			connection.executemany('UPDATE counters SET value = value + ? WHERE name = ?', [(value, name) for name, value in counts.items()])
+
+	# Method to get hit and miss counters stored in the database
+	def stats(self):
+		return dict(self.connect().execute('SELECT name, value FROM counters'))
+
+	# Method to reset hit and miss counters
+	def reset_stats(self):
+		self.take_counts()
+		with self.connect() as connection:
+			connection.execute('UPDATE counters SET value = 0')
+
+
+# Backend answering from a verdict cache and asking another backend only about words not in it
+class CachedBackend(DictionaryBackend):
+
+	def __init__(self, backend, cache):
+		self.backend = backend
+		self.cache = cache
+
+	def is_meaningful(self, word):
+		return self.lookup([word])[word]
+
+	def lookup(self, words):
+		verdicts = self.cache.get_many(set(words))
+		fresh = self.backend.lookup([word for word in set(words) if word not in verdicts])
+		self.cache.put_many(fresh)
+		verdicts.update(fresh)
+		return verdicts
+
+
+# Available backends
+backends = {
+	'wiktionary': WiktionaryBackend,
+	'wiktionary-async': AsyncWiktionaryBackend,
+	'wordlist': WordListBackend,
+}
+
+
+# Method to create a dictionary backend by name, with remote backends wrapped in a verdict cache
+def get_backend(name, cache=None, **options):
+
+	if name not in backends:
+		raise ValueError('Unknown dictionary backend %s, expected one of: %s' % (name, ', '.join(sorted(backends))))
+
+	backend = backends[name](**options)
+	if cache is not None and backend.remote:
+		backend = CachedBackend(backend, cache)
+
+	return backend
@@ -3,40 +3,40 @@ Author: Varun Chopra
 Date: 04-06-2020
 
 This Py file is responsible for segregating doubtful domain specific log data into unsuccessfully and successfully answered log data.
-Elasticsearch match query is used on both UserInput and Response fields.
-One class and three methods are defined below, with their purposes described in comments.
+Elasticsearch match query is used on both UserInput and Response fields, unless the logs carry keyword hits computed for the current keywords (see keyword_hits.py).
+When segregate_success has only reclassified some response templates, only doubtful records of those templates are resolved again (see response_labels.py).
+One class and four methods are defined below, with their purposes described in comments.
 Successfully answered log data is stored in DomainSuccessful.csv.
 Unsuccessfully answered log data is stored in DomainUnsuccessful.csv.
 '''
 
-from elasticsearch import Elasticsearch, helpers
+import sys
+import search_backend
 import pandas as pd
 import segregate_domain as sd
+import schema
+import keyword_hits
+import indexer
+import response_labels
 
 
 # Class for Elasticsearch match query on UserInput and Response fields
 class KeywordSearch(object):
 
-	# Instantiating Elasticsearch and defining index
+	# Instantiating Elasticsearch, or the in-process search client, and defining index
     def __init__(self, index):
-        self.elasticsearch = Elasticsearch()
+        self.elasticsearch = search_backend.get_client()
         self.index = index
 
     # Class method for Elasticsearch match query
+    # Clauses are run in concurrent batches, see search_backend.read_should_results
     def search(self, keywords, df):
-        query = {
-            "query": {
-                "bool": {
-                    "should": []
-                }
-            },
-            "size": 45000
-        }
+        clauses = []
         
         # Append must clause for each keyword to query.
         # Results must contain any one of the entity keywords in both UserInput and Response fields
         for keyword in keywords:
-            query["query"]["bool"]["should"].append({
+            clauses.append({
                             "bool": {
                                 "must": [
                                 {
@@ -63,24 +63,14 @@ class KeywordSearch(object):
                         }
             )
 
-        # Run elasticsearch query
-        results_gen = helpers.scan(self.elasticsearch, query=query, index=self.index, request_timeout=30)
-        results = list(results_gen)
-        
-        # Appending results to dataframe
-        for res in results:
-            df = df.append(res['_source'], ignore_index=True)
-        
-        return df
+        # Run elasticsearch queries and read all results into a dataframe with the fields of df
+        return search_backend.read_should_results(self.elasticsearch, self.index, clauses, columns=list(df.columns), request_timeout=30)
 
 
 # Method to get difference of two dataframes
 def get_difference(data, success):
 
-	unsuccess = data.merge(success, how = 'outer' ,indicator=True).loc[lambda x : x['_merge']=='left_only']
-	unsuccess = unsuccess.drop('_merge', axis=1)
-
-	return unsuccess
+	return schema.difference(data, success)
 
 
 # Method to move email and AEBAS queries from unsuccessful to successful queries extracted from doubtful queries
@@ -97,48 +87,78 @@ def email_AEBAS(success, unsuccess):
 
 	# Adding to successful
 	success = pd.concat([success, email, dataAEBAS])
-	success.to_csv('../Intermediate Log Data/DoubtToSuccessful.csv', index=False)
+	schema.write_logs(success, '../Intermediate Log Data/DoubtToSuccessful.csv')
 
 	# Removing from unsuccessful
-	unsuccess = unsuccess.merge(email, how = 'outer' ,indicator=True).loc[lambda x : x['_merge']=='left_only']
-	unsuccess = unsuccess.drop('_merge', axis=1)
-	unsuccess = unsuccess.merge(dataAEBAS, how = 'outer' ,indicator=True).loc[lambda x : x['_merge']=='left_only']
-	unsuccess = unsuccess.drop('_merge', axis=1)
-	unsuccess.to_csv('../Intermediate Log Data/DoubtToUnsuccessful.csv', index=False)
+	unsuccess = schema.difference(unsuccess, email)
+	unsuccess = schema.difference(unsuccess, dataAEBAS)
+	schema.write_logs(unsuccess, '../Intermediate Log Data/DoubtToUnsuccessful.csv')
 
 
 # Method to add doubtful log data to successful and unsuccessful log data
 def shift_doubt():
 
 	# Reading data
-	domSuc = pd.read_csv('../Intermediate Log Data/logsDomSuccess.csv')
-	doubtSuc = pd.read_csv('../Intermediate Log Data/DoubtToSuccessful.csv')
-	domUns = pd.read_csv('../Intermediate Log Data/logsDomUns.csv')
-	doubtUns = pd.read_csv('../Intermediate Log Data/DoubtToUnsuccessful.csv')
+	domSuc = schema.read_logs('../Intermediate Log Data/logsDomSuccess.csv')
+	doubtSuc = schema.read_logs('../Intermediate Log Data/DoubtToSuccessful.csv')
+	domUns = schema.read_logs('../Intermediate Log Data/logsDomUns.csv')
+	doubtUns = schema.read_logs('../Intermediate Log Data/DoubtToUnsuccessful.csv')
 	# Concatenating and writing successful data
 	domSuccess = pd.concat([domSuc,doubtSuc])
-	domSuccess.to_csv('../Intermediate Log Data/DomainSuccessful.csv', index=False)
-	domSuccess.to_csv('../To Index/DomainSuccessful.csv', index=False)
+	schema.write_logs(domSuccess, '../Intermediate Log Data/DomainSuccessful.csv')
 	# Concatenating and writing unsuccessful data
 	domUnsuccess = pd.concat([domUns,doubtUns])
-	domUnsuccess.to_csv('../Intermediate Log Data/DomainUnsuccessful.csv', index=False)
-	domUnsuccess.to_csv('../To Index/DomainUnsuccessful.csv', index=False)
+	schema.write_logs(domUnsuccess, '../Intermediate Log Data/DomainUnsuccessful.csv')
+	indexer.index_frame(search_backend.get_client(), 'domunsuccess', domUnsuccess)
+
+
+# Method to resolve only doubtful records of response templates reclassified by segregate_success, keeping earlier results of all other records
+def resolve_reclassified(dataDoubt, reclassified):
+
+	flipped = reclassified.Response.dropna().unique()
+	# Doubtful records of reclassified templates, resolved using their keyword hits
+	changed = dataDoubt[dataDoubt.Response.isin(flipped)]
+	shared = keyword_hits.shared_hit(changed)
+
+	# Earlier results of records whose templates were not reclassified
+	doubtSuc = schema.read_logs('../Intermediate Log Data/DoubtToSuccessful.csv')
+	doubtUns = schema.read_logs('../Intermediate Log Data/DoubtToUnsuccessful.csv')
+	doubtSuc = doubtSuc[~doubtSuc.Response.isin(flipped)]
+	doubtUns = doubtUns[~doubtUns.Response.isin(flipped)]
+
+	return pd.concat([doubtSuc, changed[shared]]), pd.concat([doubtUns, changed[~shared]])
 
 
 if __name__ == '__main__':
 
 	# Creating new dataframe to store results of keyword search on UserInput and Response fields
-	df = pd.DataFrame(columns=['SessionID', 'Timestamp', 'IntentName','Event','UserInput','Response'])
+	df = schema.empty_frame()
 	# Getting entity keywords data
 	searchKey = sd.get_keywords()
 
 	print('Segregating doubtful queries into successfully and unsuccessfully answered queries...')
-	# Calling search method of KeywordSearch class on 'domdoubt' index
-	doubtSuccess = KeywordSearch(index="domdoubt").search(keywords=searchKey, df=df)
 	# Reading all doubtful data
-	dataDoubt = pd.read_csv('../Intermediate Log Data/logsDomDoubt.csv')
-	# Getting unsuccessful data from doubtful data
-	doubtUnsuccess = get_difference(dataDoubt, doubtSuccess)
+	dataDoubt = schema.read_logs('../Intermediate Log Data/logsDomDoubt.csv')
+	# Records reclassified by segregate_success since the last run, when only phrase files changed
+	reclassified = schema.read_logs(response_labels.reclassified_path) if schema.logs_exist(response_labels.reclassified_path) else None
+	incremental = reclassified is not None and keyword_hits.is_current(dataDoubt, searchKey) and schema.logs_exist('../Intermediate Log Data/DoubtToSuccessful.csv') and schema.logs_exist('../Intermediate Log Data/DoubtToUnsuccessful.csv')
+
+	if incremental and reclassified.empty:
+		print('Doubtful queries are up to date.')
+		sys.exit()
+
+	if incremental:
+		print('Resolving %d reclassified queries...' % len(reclassified))
+		doubtSuccess, doubtUnsuccess = resolve_reclassified(dataDoubt, reclassified)
+	else:
+		if keyword_hits.is_current(dataDoubt, searchKey):
+			# Keeping queries where a keyword matches both UserInput and Response, using their keyword hits
+			doubtSuccess = dataDoubt[keyword_hits.shared_hit(dataDoubt)]
+		else:
+			# Calling search method of KeywordSearch class on 'domdoubt' index
+			doubtSuccess = KeywordSearch(index="domdoubt").search(keywords=searchKey, df=df)
+		# Getting unsuccessful data from doubtful data
+		doubtUnsuccess = get_difference(dataDoubt, doubtSuccess)
 	# Calling email_AEBAS method
 	email_AEBAS(doubtSuccess, doubtUnsuccess)
 
@@ -147,4 +167,6 @@ if __name__ == '__main__':
 	print('Shifting this data to unsuccessful and successful log data...')
 	# Moving segregated doubtful data to successful and unsuccessful data
 	shift_doubt()
+	# Marking all reclassified records as processed
+	schema.write_logs(dataDoubt.iloc[0:0], response_labels.reclassified_path)
 	print('Shifted data successfully.\nData stored in DomainUnsuccessful.csv and DomainSuccessful.csv')
@@ -5,15 +5,15 @@ Date: 04-06-2020
 This Py file is responsible for further segregating unsuccessfully answered domain specific log data and Task3 data.
 One method is defined below, with its purpose described in comments.
 Unsuccessfully answered domain specific log data and Task3 log data are further filtered using keyword match to get relevant data.
+Keyword hits computed when the logs were segregated are used instead of keyword match while the keywords are unchanged (see keyword_hits.py).
 Filtered unsuccessfully answered domain specific log data is stored in FilteredDomainUnsuccess.csv
 Filtered Task3 log data is stored in FilteredTask3.csv.
 '''
 
-from elasticsearch import Elasticsearch, helpers
-import pandas as pd
-from datetime import datetime
 import finalise_segregation as fs
 import segregate_domain as sd
+import schema
+import keyword_hits
 
 
 def filter():
@@ -21,24 +21,30 @@ def filter():
 	searchKey = sd.get_keywords()
 
 	print('Filtering unsuccessfully answered domain specific log data...')
-	# Creating empty dataframe
-	df = pd.DataFrame(columns=['SessionID', 'Timestamp', 'IntentName','Event','UserInput','Response'])
-	# Filtering unsuccessful domain specific data using KeywordSearch class from final_segregation.py
-	filteredUns = fs.KeywordSearch(index="domunsuccess").search(keywords=searchKey, df=df)
-	# Removing duplicates
-	filteredUns.drop_duplicates(keep=False,inplace=True)
+	domUns = schema.read_logs('../Intermediate Log Data/DomainUnsuccessful.csv')
+	if keyword_hits.is_current(domUns, searchKey):
+		# Filtering unsuccessful domain specific data using keyword hits of UserInput
+		filteredUns = domUns[keyword_hits.any_hit(domUns)]
+	else:
+		# Creating empty dataframe
+		df = schema.empty_frame()
+		# Filtering unsuccessful domain specific data using KeywordSearch class from final_segregation.py
+		filteredUns = fs.KeywordSearch(index="domunsuccess").search(keywords=searchKey, df=df)
 	# Writing to CSV file
-	filteredUns.to_csv('../Final Tasks Log Data/FilteredDomainUnsuccess.csv', index=False)
+	schema.write_logs(filteredUns, '../Final Tasks Log Data/FilteredDomainUnsuccess.csv', export=True)
 
 	print('Filtering Task3 log data...')
-	# Creating empty dataframe
-	df = pd.DataFrame(columns=['SessionID', 'Timestamp', 'IntentName','Event','UserInput','Response','SessionID2', 'Timestamp2', 'IntentName2','Event2','UserInput2','Response2'])
-	# Filtering Task3 log data using KeywordSearch class from finalise_segregation.py
-	filteredTask3 = fs.KeywordSearch(index="task3").search(keywords=searchKey, df=df)
-	# Removing duplicates
-	filteredTask3.drop_duplicates(keep=False,inplace=True)
+	task3 = schema.read_logs('../Intermediate Log Data/Task3.csv')
+	if keyword_hits.is_current(task3, searchKey):
+		# Filtering Task3 log data using keyword hits of the unsuccessful UserInput
+		filteredTask3 = task3[keyword_hits.any_hit(task3)]
+	else:
+		# Creating empty dataframe
+		df = schema.empty_frame(schema.task3_columns)
+		# Filtering Task3 log data using KeywordSearch class from finalise_segregation.py
+		filteredTask3 = fs.KeywordSearch(index="task3").search(keywords=searchKey, df=df)
 	# Writing to CSV file
-	filteredTask3.to_csv('../Final Tasks Log Data/FilteredTask3.csv', index=False)
+	schema.write_logs(filteredTask3, '../Final Tasks Log Data/FilteredTask3.csv', export=True)
 
 	print('Filtered successfully.\nData stored in FilteredDomainUnsuccess.csv and FilteredTask3.csv.')
 
@@ -5,7 +5,7 @@ Date: 04-06-2020
 This Py file is responsible for finalising the segregation of the logs into two categories:
     1. Domain specific 
     2. General
-Elasticsearch match query is used to segregate the logs based on the entity keywords.
+Elasticsearch match query is used to segregate the logs based on the entity keywords, unless the logs carry keyword hits computed for the current keywords (see keyword_hits.py).
 One class and one method are defined below, with their purposes described in comments.
 Domain specific logs are stored in DomainFinal.csv.
 General logs are stored in GeneralFinal.csv.
@@ -13,34 +13,30 @@ General logs are stored in GeneralFinal.csv.
 NOTE: This module only exists to be called by segregate_success module.
 '''
 
-from elasticsearch import Elasticsearch, helpers
+import search_backend
 import pandas as pd
 import segregate_domain as sd
+import schema
+import keyword_hits
 
 
 # Class for Elasticsearch keyword match
 class KeywordSearch(object):
 
-	# Instantiating Elasticsearch and defining index
+	# Instantiating Elasticsearch, or the in-process search client, and defining index
     def __init__(self, index):
-        self.elasticsearch = Elasticsearch()
+        self.elasticsearch = search_backend.get_client()
         self.index = index
 
     # Class method for Elasticsearch match query to further filter relevant log data 
+    # Clauses are run in concurrent batches, see search_backend.read_should_results
     def search(self, keywords, df):
-        query = {
-            "query": {
-                "bool": {
-                    "should": []
-                }
-            },
-            "size": 45000
-        }
+        clauses = []
         
         # Append clause for each keyword to query.
         # Results must contain any one of the entity keywords in UserInput field
         for keyword in keywords:
-            query["query"]["bool"]["should"].append({
+            clauses.append({
                 "match": {
                     "UserInput": {
                         "query": keyword,
@@ -50,28 +46,20 @@ class KeywordSearch(object):
                 }
              })
 
-        # Run elasticsearch query
-        results_gen = helpers.scan(self.elasticsearch, query=query, index=self.index)
-        results = list(results_gen)
-        
-        # Appending results to dataframe
-        for res in results:
-            df = df.append(res['_source'], ignore_index=True)
-        
-        return df
+        # Run elasticsearch queries and read all results into a dataframe with the fields of df
+        return search_backend.read_should_results(self.elasticsearch, self.index, clauses, columns=list(df.columns))
 
 
 # Method to get general log data classified as domain specific data by taking difference of domain specifc data before and after calling search method of KeywordSearch class
 def finalise_segregation():
 
 	# Reading CSV files
-	gen = pd.read_csv('../Intermediate Log Data/logsGeneralES.csv')
-	dom = pd.read_csv('../Intermediate Log Data/logsDomainES.csv')
-	domfinal = pd.read_csv('../Intermediate Log Data/logsDomainESFinal.csv')
+	gen = schema.read_logs('../Intermediate Log Data/logsGeneralES.csv')
+	dom = schema.read_logs('../Intermediate Log Data/logsDomainES.csv')
+	domfinal = schema.read_logs('../Intermediate Log Data/logsDomainESFinal.csv')
 
 	# Getting general queries wrongly classified as domain specific
-	domtogen = dom.merge(domfinal, how = 'outer' ,indicator=True).loc[lambda x : x['_merge']=='left_only']
-	domtogen = domtogen.drop('_merge', axis=1)
+	domtogen = schema.difference(dom, domfinal)
 
 	# Append to general logs csv
 	genfinal = pd.concat([gen, domtogen])
@@ -85,16 +73,15 @@ def finalise_segregation():
 
 	# Adding email data to domain specific
 	domfinal = pd.concat([domfinal, email])
-	domfinal.to_csv('../Intermediate Log Data/DomainFinal.csv', index=False)
+	schema.write_logs(domfinal, '../Intermediate Log Data/DomainFinal.csv')
 
 	# Removing email data from general
-	genfinal = genfinal.merge(email, how = 'outer' ,indicator=True).loc[lambda x : x['_merge']=='left_only']
-	genfinal = genfinal.drop('_merge', axis=1)
+	genfinal = schema.difference(genfinal, email)
 
     # Removing entries with only 'yes' and 'no' in UserInput
 	genfinal = genfinal[(genfinal['UserInput'].str.lower() != 'yes') & (genfinal['UserInput'].str.lower() != 'no')]
 
-	genfinal.to_csv('../Intermediate Log Data/GeneralFinal.csv', index=False)
+	schema.write_logs(genfinal, '../Intermediate Log Data/GeneralFinal.csv')
 
 
 # Main method to be called by segregate_success module
@@ -104,14 +91,17 @@ def main():
     searchKey = sd.get_keywords()
 
     print('Finalising domain segregation...')
-    # Creating empty dataframe
-    df = pd.DataFrame(columns=['SessionID', 'Timestamp', 'IntentName','Event','UserInput','Response'])
-    # Calling search method of KeywordSearch class
-    df = KeywordSearch(index="logsdomain").search(keywords=searchKey, df=df)
-    # Removing duplicates
-    df.drop_duplicates(keep=False,inplace=True)
+    dom = schema.read_logs('../Intermediate Log Data/logsDomainES.csv')
+    if keyword_hits.is_current(dom, searchKey):
+        # Keeping queries matching any keyword, using their keyword hits
+        df = dom[keyword_hits.any_hit(dom)]
+    else:
+        # Creating empty dataframe
+        df = schema.empty_frame()
+        # Calling search method of KeywordSearch class
+        df = KeywordSearch(index="logsdomain").search(keywords=searchKey, df=df)
     # Writing to csv file
-    df.to_csv('../Intermediate Log Data/logsDomainESFinal.csv', index=False)
+    schema.write_logs(df, '../Intermediate Log Data/logsDomainESFinal.csv')
     # Calling finalise_segregation method
     finalise_segregation()
     print('Segregation successful. Data stored in GeneralFinal.csv and DomainFinal.csv')
@@ -0,0 +1,74 @@
+'''
+This Py file is responsible for fuzzy matching of tokens against a vocabulary of keywords, the way a match query with fuzziness AUTO does in Elasticsearch.
+A keyword matches a token when their edit distance is within the fuzziness AUTO of the keyword.
+Keywords are indexed by every string obtained by deleting up to two of their characters, so a token is looked up by deleting characters from it instead of comparing it with every keyword.
+Two classes and one method are defined below, with their purposes described in comments.
+'''
+
+from collections import defaultdict
+import schema
+from text_analysis import tokenize, auto_fuzziness, edit_distance
+
+
+# Method to get every string obtained by deleting up to distance characters from a term, including the term itself
+def deletes(term, distance):
+
+	variants = {term}
+	frontier = {term}
+	for _ in range(distance):
+		frontier = {variant[:i] + variant[i + 1:] for variant in frontier for i in range(len(variant))}
+		variants |= frontier
+
+	return variants
+
+
+# Class for a deletion index over a vocabulary of terms
+class FuzzyIndex(object):
+
+	def __init__(self, terms=()):
+		self.distances = {}
+		self.variants = defaultdict(set)
+		self.max_distance = 0
+		self.cache = {}
+		for term in terms:
+			self.add(term)
+
+	# Method to add a term, matching tokens within distance edits (fuzziness AUTO by default)
+	def add(self, term, distance=None):
+		if distance is None:
+			distance = auto_fuzziness(term)
+		self.distances[term] = distance
+		self.max_distance = max(self.max_distance, distance)
+		for variant in deletes(term, distance):
+			self.variants[variant].add(term)
+		self.cache = {}
+
+	# Method to get the terms matching a token
+	def lookup(self, token):
+		if token not in self.cache:
+			candidates = set()
+			for variant in deletes(token, self.max_distance):
+				candidates |= self.variants.get(variant, set())
+			self.cache[token] = frozenset(term for term in candidates if edit_distance(term, token, self.distances[term]) <= self.distances[term])
+		return self.cache[token]
+
+	# Method to check whether any term matches a token
+	def matches(self, token):
+		return bool(self.lookup(token))
+
+
+# Class for classifying text by whether any of its tokens fuzzily matches a keyword
+class KeywordClassifier(object):
+
+	# Indexing the tokens of the keyword string
+	def __init__(self, keywords):
+		self.index = FuzzyIndex(set(tokenize(keywords)))
+
+	# Method to check whether a text contains a keyword
+	def contains_keyword(self, text):
+		return any(self.index.matches(token) for token in tokenize(text))
+
+	# Method to classify every entry of a series, classifying each distinct text once
+	# Returns a boolean mask of entries containing a keyword
+	def classify(self, series):
+		return schema.map_distinct(series, self.contains_keyword, False)
@@ -0,0 +1,97 @@
+'''
+This Py file is responsible for indexing log data into the search backend, so every stage can query the data written by the stage before it.
+Log data is streamed into Elasticsearch with parallel bulk requests, with refresh disabled while the index is loaded and a single refresh at the end.
+An index is recreated every time it is loaded, so it holds exactly the data it was loaded from.
+With the local search backend the dataframe is served directly by the in-process client.
+It can also be run on its own to index a file:
+	python indexer.py <index> <path>
+Four methods are defined below, with their purposes described in comments.
+'''
+
+import sys
+import pandas as pd
+import search_backend
+import schema
+
+
+# Number of documents per bulk request
+chunk_size = 2000
+
+# Number of bulk requests in flight
+bulk_threads = 4
+
+# Number of CSV rows read at a time by index_csv
+read_rows = 50000
+
+
+# Method to get documents of a dataframe, with timestamps formatted as in the logs and missing values left out
+# Records are indexed with their RowID as document ID, so they keep their identity through Elasticsearch
+def documents(df, index):
+
+	for column in df.columns:
+		if pd.api.types.is_datetime64_any_dtype(df[column]):
+			df = df.assign(**{column: df[column].dt.strftime(schema.timestamp_format)})
+
+	for record in df.astype(object).where(df.notna(), None).to_dict('records'):
+		action = {'_index': index, '_source': {key: value for key, value in record.items() if value is not None}}
+		# A Task3 record is identified by the IDs of both of its records
+		ids = [record[column] for column in schema.id_columns if record.get(column) is not None]
+		if ids:
+			action['_id'] = '-'.join(str(value) for value in ids)
+		yield action
+
+
+# Method to load documents into a freshly created index with parallel bulk requests
+# Returns the number of documents indexed
+def bulk_load(client, index, actions, chunk_size=chunk_size, threads=bulk_threads):
+
+	from elasticsearch import helpers
+
+	client.indices.delete(index=index, ignore=[404])
+	client.indices.create(index=index, body={'settings': {'index': {'refresh_interval': '-1'}}})
+
+	count = 0
+	try:
+		for ok, item in helpers.parallel_bulk(client, actions, thread_count=threads, chunk_size=chunk_size):
+			count += 1
+	finally:
+		# Restoring the default refresh interval and making the documents searchable
+		client.indices.put_settings(index=index, body={'index': {'refresh_interval': None}})
+		client.indices.refresh(index=index)
+
+	return count
+
+
+# Method to index a dataframe, replacing any earlier contents of the index
+def index_frame(client, index, df, chunk_size=chunk_size, threads=bulk_threads):
+
+	print('Indexing %d records into \'%s\' index...' % (len(df), index))
+	if isinstance(client, search_backend.LocalSearch):
+		client.index_frame(index, df)
+		count = len(df)
+	else:
+		count = bulk_load(client, index, documents(df, index), chunk_size, threads)
+	print('Indexed.\n')
+
+	return count
+
+
+# Method to index a CSV or intermediate log data file, reading a CSV file a block of rows at a time
+def index_csv(client, index, path, chunk_size=chunk_size, threads=bulk_threads):
+
+	if isinstance(client, search_backend.LocalSearch) or schema.storage_format != 'csv':
+		df = pd.read_csv(path) if index == 'keywords' else schema.read_logs(path)
+		return index_frame(client, index, df, chunk_size, threads)
+
+	print('Indexing %s into \'%s\' index...' % (path, index))
+	# Fields are indexed as written, so timestamps keep their log format
+	actions = (action for block in pd.read_csv(path, dtype=str, chunksize=read_rows) for action in documents(block, index))
+	count = bulk_load(client, index, actions, chunk_size, threads)
+	print('Indexed %d records.\n' % count)
+
+	return count
+
+
+if __name__ == '__main__':
+
+	index_csv(search_backend.get_client(), sys.argv[1], sys.argv[2])
@@ -0,0 +1,115 @@
+'''
+This Py file is responsible for computing which entity keywords every log record matches, once, when log data is segregated.
+A keyword matches a field the way the match query of KeywordSearch does, with operator and and fuzziness AUTO: every term of the keyword has to fuzzily match a token of the field.
+The keywords matched by UserInput and Response are stored with every record as bitsets in the UserInputHits and ResponseHits fields, bit i standing for keyword i of the keyword list.
+Bitsets are written as hexadecimal strings, e.g. '0x5' for keywords 0 and 2, since there can be more keywords than bits in an integer field.
+The keyword list the bitsets were computed for is recorded in keywordHits.json, so later stages filter records by their bitsets only while the keywords are unchanged.
+One class and six methods are defined below, with their purposes described in comments.
+'''
+
+import os
+import json
+import hashlib
+from collections import defaultdict
+import pandas as pd
+import numpy as np
+import schema
+from text_analysis import tokenize
+from fuzzy_index import FuzzyIndex
+
+
+# Keyword list the stored bitsets were computed for
+state_path = '../Intermediate Log Data/keywordHits.json'
+
+# Fields matched against the keywords, and the fields their bitsets are stored in
+hit_fields = {'UserInput': 'UserInputHits', 'Response': 'ResponseHits'}
+
+
+# Class for matching text against every keyword at once
+class KeywordMatcher(object):
+
+	# Indexing the distinct terms of all keywords
+	def __init__(self, keywords):
+		self.terms = [set(tokenize(keyword)) for keyword in keywords]
+		self.index = FuzzyIndex(set().union(*self.terms))
+		# Keywords containing each term
+		self.keywords = defaultdict(list)
+		for position, terms in enumerate(self.terms):
+			for term in terms:
+				self.keywords[term].append(position)
+
+	# Method to get the bitset of keywords all of whose terms match a token of the text
+	def hits(self, text):
+		matched = set()
+		for token in set(tokenize(text)):
+			matched |= self.index.lookup(token)
+
+		counts = defaultdict(int)
+		for term in matched:
+			for position in self.keywords[term]:
+				counts[position] += 1
+
+		bits = 0
+		for position, count in counts.items():
+			if count == len(self.terms[position]):
+				bits |= 1 << position
+
+		return bits
+
+	# Method to get bitsets of every entry of a series as hexadecimal strings, matching each distinct text once
+	def hit_series(self, series):
+		# Missing entries get the empty bitset
+		bitsets = schema.map_distinct(series, lambda text: hex(self.hits(text)), hex(0), dtype=object)
+		return pd.Series(bitsets, index=series.index)
+
+
+# Method to get a digest identifying a keyword list, including the order which defines the bits
+def keyword_digest(keywords):
+
+	return hashlib.sha1(json.dumps(list(keywords)).encode('utf-8')).hexdigest()
+
+
+# Method to add keyword bitsets of UserInput and Response to log data
+def annotate(df, keywords):
+
+	print('Computing keyword hits of every query and response...')
+	matcher = KeywordMatcher(keywords)
+	df = df.assign(**{hits: matcher.hit_series(df[field]) for field, hits in hit_fields.items()})
+	print('Keyword hits computed.\n')
+
+	return df
+
+
+# Method to record the keyword list bitsets were computed for
+def save_state(keywords):
+
+	with open(state_path + '.tmp', 'w') as f:
+		json.dump({'digest': keyword_digest(keywords), 'keywords': len(keywords)}, f)
+	os.replace(state_path + '.tmp', state_path)
+
+
+# Method to check whether log data carries bitsets computed for the keyword list
+def is_current(df, keywords):
+
+	if not all(hits in df.columns and df[hits].notna().all() for hits in hit_fields.values()) or not os.path.exists(state_path):
+		return False
+
+	with open(state_path) as f:
+		state = json.load(f)
+
+	return state.get('digest') == keyword_digest(keywords)
+
+
+# Method to get a boolean mask of records whose field matches any keyword
+def any_hit(df, field='UserInput'):
+
+	# Bitsets are written without leading zeros, so the empty bitset is always '0x0'
+	return (df[hit_fields[field]].astype(str) != hex(0)).to_numpy()
+
+
+# Method to get a boolean mask of records where some keyword matches both UserInput and Response
+def shared_hit(df):
+
+	pairs = zip(df[hit_fields['UserInput']].astype(str), df[hit_fields['Response']].astype(str))
+
+	return np.fromiter((int(user, 16) & int(response, 16) != 0 for user, response in pairs), dtype=bool, count=len(df))
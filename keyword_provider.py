@@ -0,0 +1,105 @@
+'''
+This Py file is responsible for providing the entity keywords to every stage of the analysis.
+Keywords are read from the Elasticsearch 'keywords' index, all of them however many there are, and preprocessed once.
+The compiled keyword set is stored in keywords.snapshot.json along with the version of the index it was read from, and is reused until the index changes.
+One class and one method are defined below, with their purposes described in comments.
+'''
+
+import os
+import json
+import search_backend
+from text_analysis import tokenize
+
+
+# Snapshot of the compiled keyword set
+snapshot_path = '../Intermediate Log Data/keywords.snapshot.json'
+
+# Index and field holding the entity keywords
+keyword_index = 'keywords'
+keyword_field = 'Attendance Marking Issue'
+
+# English stopwords, loaded once
+stop_words = None
+
+
+# Method to remove stopwords and duplicates from the tokens of the keywords, using NLTK
+def filter_keywords(searchKey):
+
+	global stop_words
+
+	# NLTK is only needed when keywords are preprocessed
+	from nltk.corpus import stopwords
+	from nltk.tokenize import word_tokenize
+
+	if stop_words is None:
+		stop_words = set(stopwords.words('english'))
+
+	word_tokens = word_tokenize(' '.join(searchKey) + ' ')
+	filtered_keywords = [w for w in word_tokens if w not in stop_words]
+
+	# Removing duplicate words from filtered_keywords
+	return list(dict.fromkeys(filtered_keywords))
+
+
+# Class for loading the keyword set once and caching it on disk, keyed by the version of the keywords index
+class KeywordProvider(object):
+
+	def __init__(self, client=None, index=keyword_index, path=snapshot_path):
+		self.client = client
+		self.index = index
+		self.path = path
+		self.current = None
+
+	# Method to get the compiled keyword set, reading the index only when the snapshot is out of date
+	def snapshot(self):
+		if self.current is not None:
+			return self.current
+
+		if self.client is None:
+			self.client = search_backend.get_client()
+		version = search_backend.index_version(self.client, self.index)
+
+		if os.path.exists(self.path):
+			with open(self.path) as f:
+				snapshot = json.load(f)
+			if version is not None and snapshot.get('version') == version:
+				self.current = snapshot
+				return snapshot
+
+		self.current = self.compile(version)
+		with open(self.path + '.tmp', 'w') as f:
+			json.dump(self.current, f)
+		os.replace(self.path + '.tmp', self.path)
+
+		return self.current
+
+	# Method to read all keywords from the index and preprocess them
+	def compile(self, version):
+		print('Getting keywords from Elasticsearch \'%s\' index...' % self.index)
+		results = search_backend.read_results(self.client, self.index, {'query': {'match_all': {}}}, columns=[keyword_field])
+		raw = ['%s' % keyword for keyword in results[keyword_field] if keyword is not None]
+
+		filtered = filter_keywords(raw)
+
+		return {
+			'version': version,
+			'raw': raw,
+			'filtered': filtered,
+			'normalized': sorted(set(token for keyword in filtered for token in tokenize(keyword))),
+		}
+
+	# Method to get keywords as stored in the index
+	def raw(self):
+		return self.snapshot()['raw']
+
+	# Method to get keyword tokens without stopwords and duplicates
+	def filtered(self):
+		return self.snapshot()['filtered']
+
+	# Method to get lowercase keyword terms as matched by the search analyzer
+	def normalized(self):
+		return self.snapshot()['normalized']
+
+
+# Keyword provider shared by the stages running in this process
+provider = KeywordProvider()
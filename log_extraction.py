@@ -3,13 +3,51 @@ Author: Varun Chopra
 Date: 04-06-2020
 
 This Py file is responsible for extracting NSD log data from the directory tree and storing them in an organised manner in a CSV file.
-Two methods are defined below, with their purposes described in comments.
+Log files are memory-mapped and parsed lazily into query/response records which are written to the CSV file in batches through a single file handle.
+Methods and classes are defined below, with their purposes described in comments.
 The extracted logs are stored in a newly created file, logsAll.csv.
+Session files are also read straight out of .tar/.tar.gz/.tgz/.zip archives and .txt.gz files without extracting them to disk.
+A manifest of the extracted log files is kept alongside, so that later runs only parse new or changed log files.
+Records with the same contents as another record are dropped when they are extracted, keeping the first of them by default (see dedup.py).
+Every record gets a RowID, a 64-bit hash of its session, timestamp and position in the chat, which stays the same across runs and identifies the record in every later stage.
+Pass --full to rebuild logsAll.csv from every log file.
 '''
 
 import os
+import sys
 import csv
-import re
+import json
+import hashlib
+import mmap
+import gzip
+import tarfile
+import zipfile
+from itertools import chain, islice, count
+from multiprocessing import Pool
+from anonymisation import anonymiser
+from dedup import Deduplicator
+
+
+# Fields of every extracted query/response record
+header = ['SessionID', 'Timestamp', 'IntentName', 'Event', 'UserInput', 'Response', 'RowID']
+
+# Interactions which are not extracted
+greetings = ['#Greetings', '#Default Welcome Intent:Left_at_welcome', '#WelcomeIntent', '#Default Welcome Intent']
+
+# Number of records buffered before they are written to the CSV file
+batch_size = 10000
+
+# Archives of session files
+archive_extensions = ('.tar', '.tar.gz', '.tgz', '.zip')
+
+# Number of bytes read at a time from compressed session files
+read_size = 1 << 20
+
+# Manifest of log files already extracted to logsAll.csv
+manifest_path = '../Intermediate Log Data/logsAll.manifest.json'
+
+# Multiprocessing
+num_processes = os.cpu_count() 		# Number of worker processes parsing log files
 
 
 # Method to traverse directory and get path to each log file
@@ -19,7 +57,7 @@ def traverse_directory(path):
 	# r=root, d=directories, f = files
 	for r, d, f in os.walk(path):
 		for file in f:
-			if '.txt' in file:
+			if '.txt' in file or file.endswith(archive_extensions):
 				files.append(os.path.join(r, file))
 
 	files = sorted(files)
@@ -27,101 +65,417 @@ def traverse_directory(path):
 	return files
 
 
-# Method to extract logs from each log file
-def extract_queries(logs):
+# Method to get Session ID from path of a log file
+def session_id(log):
 
-	# Write header to CSV file
-	header = 'SessionID Timestamp IntentName Event UserInput Response'
-	header = header.split()
-	file = open('../Intermediate Log Data/logsAll.csv', 'w', newline='')
-	with file:
-	    writer = csv.writer(file)
-	    writer.writerow(header)
+	name = os.path.basename(log)
+	if name.endswith('.gz'):
+		name = name[:-3]
+
+	# Removing '-WebChatBot.txt' from log file name
+	return name[:-15]
+
+
+# Method to check whether a path is an archive of session files
+def is_archive(log):
+
+	return log.endswith(archive_extensions)
+
+
+# Method to check whether an archive member is a session file
+def is_session_file(name):
+
+	return '.txt' in name and '.DS_Store' not in name and '__MACOSX' not in name
+
+
+# Method to anonymise a single '||' delimited segment of a log file
+# Line breaks are removed whatever their style, as reading the log file in text mode did
+def clean_segment(segment):
+
+	return anonymiser.anonymise(segment.replace(b'\r', b'').replace(b'\n', b'').decode('utf-8'))
+
+
+# Generator yielding the '||' delimited segments of a log file
+# The log file is memory-mapped and only the segment being yielded is copied out of it
+def iter_segments(log):
+
+	with open(log, 'rb') as f:
+		# Empty files cannot be memory-mapped
+		if os.fstat(f.fileno()).st_size == 0:
+			yield ''
+			return
+
+		with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as chat:
+			start = 0
+			while True:
+				end = chat.find(b'||', start)
+				if end == -1:
+					yield clean_segment(chat[start:])
+					return
+				yield clean_segment(chat[start:end])
+				start = end + 2
+
+
+# Generator yielding the '||' delimited segments of a file object, read sequentially in blocks
+def iter_stream_segments(f):
+
+	pending = b''
+	for block in iter(lambda: f.read(read_size), b''):
+		pending += block
+		start = 0
+		while True:
+			end = pending.find(b'||', start)
+			if end == -1:
+				break
+			yield clean_segment(pending[start:end])
+			start = end + 2
+		pending = pending[start:]
+
+	yield clean_segment(pending)
+
+
+# Generator yielding Session ID and segments of every session file in a log file or archive
+# Members of tar archives are read in archive order in a single sequential pass, members of zip archives in sorted order
+def iter_sessions(log):
+
+	if log.endswith('.zip'):
+		with zipfile.ZipFile(log) as archive:
+			for name in sorted(archive.namelist()):
+				if is_session_file(name):
+					with archive.open(name) as f:
+						yield session_id(name), iter_stream_segments(f)
+
+	elif is_archive(log):
+		with tarfile.open(log, 'r|*') as archive:
+			for member in archive:
+				if member.isfile() and is_session_file(member.name):
+					yield session_id(member.name), iter_stream_segments(archive.extractfile(member))
+
+	elif log.endswith('.gz'):
+		with gzip.open(log, 'rb') as f:
+			yield session_id(log), iter_stream_segments(f)
+
+	else:
+		yield session_id(log), iter_segments(log)
+
+
+# Method to get the ID of a record, a signed 64-bit integer so that it fits integer fields of pandas and Elasticsearch
+def row_id(session, timestamp, turn):
+
+	digest = hashlib.blake2b(('%s\x1f%s\x1f%d' % (session, timestamp, turn)).encode('utf-8'), digest_size=8).digest()
+
+	return int.from_bytes(digest, 'big', signed=True)
+
+
+# Generator yielding every query/response record of a single chat, given its segments
+def parse_chat(session, segments):
+
+	segments = iter(segments)
+
+	# The first two segments decide where the first query/response pair begins
+	head = list(islice(segments, 2))
+	if len(head) < 2:
+		return
+
+	timeFirstQuery = head[1]
+	timeFirstQuery = timeFirstQuery.split('#')
+	firstQuery = timeFirstQuery[1]
+
+	# When user enters query before welcome intent
+	if firstQuery != 'User:' and firstQuery[:5] != 'Vani:':
+		i=0
+	# When user enters query after welcome intent
+	elif firstQuery[:5] == 'Vani:':
+		i=2
+	# When interaction begins with an empty query from user, followed by VANI's greeting.
+	elif firstQuery == 'User:':
+		i=3
+	#checking for some other form of data
+	else:
+		print('additional data')
+		return
+
+	segments = islice(chain(head, segments), i, None)
+
+	# Every iteration of the following loop extracts a single query/response pair from the chat
+	# turn counts the pairs of the chat, including skipped ones, for the record ID
+	for turn in count():
+
+		# queryType contains Intent and Event details, timeQuery contains timestamp and query
+		triple = list(islice(segments, 3))
+		if len(triple) < 3:
+			break
+		queryType, timeQuery, response = triple
+
+		# Avoiding irrelevant interactions
+		if queryType in greetings:
+			continue
+
+		event = ''
+		intent = ''
+
+		# Getting Intent and Event from queryType
+		queryType = queryType.split(':')
+		intent = queryType[0]
+		if len(queryType) > 1:
+			event = queryType[1]
+
+		timeQuery = timeQuery.split('#')
+		timestamp = timeQuery[0]
+		query = timeQuery[1]
+
+		# Removing irrelevant parts of different fields
+		intent = intent.replace('#','')
+		query = query.replace('User:','')
+		response = response.replace('Vani:','')
+
+		yield [session,timestamp,intent,event,query,response,row_id(session, timestamp, turn)]
+
+
+# Generator yielding every record of a log file or archive
+def iter_file_records(log):
+
+	for session, segments in iter_sessions(log):
+		yield from parse_chat(session, segments)
+
+
+# Method to parse and anonymise a single log file or archive, run by worker processes
+def parse_log(log):
+
+	return list(iter_file_records(log))
 
-	# Extraction of log data
-	for log in logs:
 
-		# Skip macOS Desktop Services Store files
+# Generator yielding every log file along with its records, one log file at a time
+# With more than one process, log files are parsed in a process pool and merged back in their sorted order
+def iter_log_files(logs, processes=1):
+
+	# Skip macOS Desktop Services Store files
+	logs = [log for log in logs if '.DS_Store' not in log]
+
+	if processes is None or processes <= 1 or len(logs) <= 1:
+		for log in logs:
+			yield log, iter_file_records(log)
+		return
+
+	# Small shards keep every worker busy while imap preserves the order of the log files
+	chunksize = max(1, len(logs) // (processes * 16))
+	with Pool(processes) as pool:
+		yield from zip(logs, pool.imap(parse_log, logs, chunksize))
+
+
+# Generator yielding the records of every log file lazily
+def iter_log_records(logs, processes=1):
+
+	for log, records in iter_log_files(logs, processes):
+		yield from records
+
+
+# Class for writing records to a CSV file in batches through a single open file handle
+class CSVSink(object):
+
+	# Opening CSV file and writing header
+	def __init__(self, path, header=header, batch_size=batch_size, mode='w'):
+		self.file = open(path, mode, newline='')
+		self.writer = csv.writer(self.file)
+		self.batch_size = batch_size
+		self.buffer = []
+		self.count = 0
+		if header is not None:
+			self.writer.writerow(header)
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		self.close()
+
+	# Method to buffer a single record
+	def write(self, record):
+		self.buffer.append(record)
+		if len(self.buffer) >= self.batch_size:
+			self.flush()
+
+	# Method to buffer every record of an iterable
+	def write_all(self, records):
+		for record in records:
+			self.write(record)
+
+	# Method to write buffered records to the CSV file
+	def flush(self):
+		if self.buffer:
+			self.writer.writerows(self.buffer)
+			self.count += len(self.buffer)
+			self.buffer = []
+
+	def close(self):
+		self.flush()
+		self.file.close()
+
+
+# Method to get content hash of a log file
+def hash_file(log):
+
+	digest = hashlib.sha1()
+	with open(log, 'rb') as f:
+		for block in iter(lambda: f.read(1 << 20), b''):
+			digest.update(block)
+
+	return digest.hexdigest()
+
+
+# Method to get size, modification time and content hash of a log file
+def file_signature(log, previous=None):
+
+	stat = os.stat(log)
+	signature = {'size': stat.st_size, 'mtime': stat.st_mtime}
+
+	# Hashing is skipped when size and modification time are unchanged
+	if previous and previous['size'] == signature['size'] and previous['mtime'] == signature['mtime']:
+		signature['hash'] = previous['hash']
+	else:
+		signature['hash'] = hash_file(log)
+
+	# Sessions extracted from an unchanged archive are carried over
+	if previous and 'sessions' in previous and previous['hash'] == signature['hash']:
+		signature['sessions'] = previous['sessions']
+
+	return signature
+
+
+# Method to read manifest of extracted log files
+def load_manifest(path=manifest_path):
+
+	if not os.path.exists(path):
+		return {}
+
+	with open(path) as f:
+		return json.load(f)
+
+
+# Method to write manifest of extracted log files
+def save_manifest(manifest, path=manifest_path):
+
+	# Writing to a temporary file first so that an interrupted run never leaves a partial manifest
+	with open(path + '.tmp', 'w') as f:
+		json.dump(manifest, f, indent=1, sort_keys=True)
+	os.replace(path + '.tmp', path)
+
+
+# Method to compare log files against the manifest
+# Returns new and changed log files, log files no longer present and the updated manifest
+def diff_manifest(logs, manifest):
+
+	new, changed = [], []
+	updated = {}
+
+	for log in logs:
 		if '.DS_Store' in log:
 			continue
+		previous = manifest.get(log)
+		updated[log] = file_signature(log, previous)
+		if previous is None:
+			new.append(log)
+		elif previous['hash'] != updated[log]['hash']:
+			changed.append(log)
+
+	removed = [log for log in manifest if log not in updated]
+
+	return new, changed, removed, updated
+
+
+# Method to drop records of the given sessions from an existing CSV file
+def drop_sessions(output, sessions):
+
+	with open(output, newline='') as src, CSVSink(output + '.tmp', header=None) as sink:
+		reader = csv.reader(src)
+		sink.write(next(reader))
+		for record in reader:
+			if record[0] not in sessions:
+				sink.write(record)
+	os.replace(output + '.tmp', output)
 
-        # Split log file path with '/' delimiter
-		logSplit = log.split('/')
-        # Getting log file name
-		session = logSplit[6]
-        # Removing '-WebChatBot.txt' to get Session ID
-		session = session[:-15]
-
-        # Opening and reading log file
-		f = open(log, "r")
-		chat = f.read()
-		chat = chat.replace('\n','')
-
-        # Data Anonymisation
-		chat = re.sub('[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+','abc@xyz.com',chat)
-		chat = re.sub('[0-9]{10}','9XXXXXXXXX',chat)
-
-		# Split chat with '||' delimiter
-		chatSplit = chat.split('||')
-
-		timeFirstQuery = chatSplit[1]
-		timeFirstQuery = timeFirstQuery.split('#')
-		firstQuery = timeFirstQuery[1]
-
-        # When user enters query before welcome intent
-		if firstQuery != 'User:' and firstQuery[:5] != 'Vani:':
-			i=0
-        # When user enters query after welcome intent
-		elif firstQuery[:5] == 'Vani:':
-			i=2
-        # When interaction begins with an empty query from user, followed by VANI's greeting.
-		elif firstQuery == 'User:':
-			i=3
-        #checking for some other form of data
-		else:
-			print('additional data')
-
-		# Every iteration of the following loop extracts a single query/response pair from the current log file
-		while i+2 < len(chatSplit):
-
-			# queryType contains Intent and Event details
-			queryType = chatSplit[i]
-
-			# Avoiding irrelevant interactions
-			if queryType in ['#Greetings','#Default Welcome Intent:Left_at_welcome','#WelcomeIntent','#Default Welcome Intent']:
-				i+=3
-
-			event = ''
-			intent = ''
-
-			# Getting Intent and Event from queryType
-			queryType = queryType.split(':')
-			intent = queryType[0]
-			if len(queryType) > 1:
-				event = queryType[1]
-
-			# timeQuery contains timestamp and query
-			timeQuery = chatSplit[i+1]
-
-			timeQuery = timeQuery.split('#')
-			timestamp = timeQuery[0]
-			query = timeQuery[1]
-
-			response = chatSplit[i+2]
-
-			# Removing irrelevant parts of different fields
-			intent = intent.replace('#','')
-			query = query.replace('User:','')
-			response = response.replace('Vani:','')
-
-			# Writing to csv file
-			to_append = [session,timestamp,intent,event,query,response]
-			file = open('../Intermediate Log Data/logsAll.csv', 'a', newline='')
-			with file:
-				writer = csv.writer(file)
-				writer.writerow(to_append)
-
-			i+=3
+
+# Method to write records of log files to a CSV sink, noting the sessions found in every archive in the manifest
+# Duplicate records are dropped by the deduplicator when it keeps the first of them
+def write_log_files(sink, logs, processes, manifest, deduplicator):
+
+	for log, records in iter_log_files(logs, processes):
+		sessions = set()
+		for record in records:
+			sessions.add(record[0])
+			if deduplicator.keep != 'first' or not deduplicator.is_duplicate(record):
+				sink.write(record)
+		if is_archive(log):
+			manifest[log]['sessions'] = sorted(sessions)
+
+
+# Method to get the fields of an extracted CSV file
+def read_header(path):
+
+	with open(path, newline='') as f:
+		return next(csv.reader(f), None)
+
+
+# Method to drop duplicate records of an extracted CSV file once all records are written, reading the file twice
+# Returns the number of records kept
+def drop_duplicate_records(output, deduplicator):
+
+	def records():
+		with open(output, newline='') as f:
+			reader = csv.reader(f)
+			next(reader)
+			yield from reader
+
+	kept = deduplicator.kept_positions(records())
+	with CSVSink(output + '.tmp') as sink:
+		sink.write_all(record for position, record in enumerate(records()) if position in kept)
+	os.replace(output + '.tmp', output)
+
+	return sink.count
+
+
+# Method to extract logs from each log file
+# Only new and changed log files are extracted and appended unless full is set or there is no manifest yet
+def extract_queries(logs, output='../Intermediate Log Data/logsAll.csv', processes=1, manifest=manifest_path, full=False):
+
+	# Duplicates are compared on all fields but RowID
+	deduplicator = Deduplicator(fields=range(len(header) - 1))
+
+	# Log data extracted with different fields is extracted again
+	# Keeping the last of duplicate records, or none of them, needs every record, so all log files are extracted again
+	previous = {} if full or deduplicator.keep != 'first' or not os.path.exists(output) or read_header(output) != header else load_manifest(manifest)
+	new, changed, removed, updated = diff_manifest(logs, previous)
+
+	if not previous:
+		# Extraction of log data in a single streaming pass
+		with CSVSink(output) as sink:
+			write_log_files(sink, logs, processes, updated, deduplicator)
+		extracted = sink.count
+		if deduplicator.keep != 'first':
+			extracted = drop_duplicate_records(output, deduplicator)
+	else:
+		# Records of changed and deleted log files are replaced
+		stale = set()
+		for log in changed + removed:
+			stale.update(previous[log].get('sessions', [session_id(log)]))
+		if stale:
+			drop_sessions(output, stale)
+		# New records are compared with the records already extracted
+		with open(output, newline='') as f:
+			reader = csv.reader(f)
+			next(reader)
+			for record in reader:
+				deduplicator.is_duplicate(record)
+		deduplicator.dropped = 0
+		with CSVSink(output, header=None, mode='a') as sink:
+			write_log_files(sink, sorted(new + changed), processes, updated, deduplicator)
+		extracted = sink.count
+
+	save_manifest(updated, manifest)
+	if deduplicator.dropped:
+		print('Dropped %d duplicate records.' % deduplicator.dropped)
+
+	return extracted
 
 
 if __name__ == '__main__':
@@ -132,7 +486,7 @@ if __name__ == '__main__':
 	logs = traverse_directory(path)
 
 	print('Extracting log data...')
-	#Calling extract_queries method
-	extract_queries(logs)
+	#Calling extract_queries method on all available cores
+	extracted = extract_queries(logs, processes=num_processes, full='--full' in sys.argv)
 
-	print('Logs extracted successfully to logsAll.csv')
+	print('%d logs extracted successfully to logsAll.csv' % extracted)
@@ -0,0 +1,71 @@
+'''
+This Py file is responsible for finding response phrases, such as those of unsuccessful.txt and doubtful.txt, in chatbot responses.
+All phrases are matched in a single scan of the text by an Aho-Corasick automaton, ignoring case.
+Phrases are matched literally, so characters such as '?', '(' or '.' in a phrase stand for themselves.
+Since responses are mostly a small set of canned replies, every distinct response is classified once and its verdict looked up for every record.
+One class is defined below, with its purpose described in comments.
+'''
+
+from collections import deque
+import schema
+
+
+# Class for an Aho-Corasick automaton over a set of phrases
+class PhraseMatcher(object):
+
+	# Building the trie of the lowercase phrases and linking every state to the longest proper suffix state
+	def __init__(self, phrases):
+		# Empty phrases are left out, they would match every text
+		self.phrases = [phrase for phrase in dict.fromkeys(phrase.lower() for phrase in phrases) if phrase]
+		self.transitions = [{}]
+		self.outputs = [set()]
+
+		for position, phrase in enumerate(self.phrases):
+			state = 0
+			for char in phrase:
+				if char not in self.transitions[state]:
+					self.transitions.append({})
+					self.outputs.append(set())
+					self.transitions[state][char] = len(self.transitions) - 1
+				state = self.transitions[state][char]
+			self.outputs[state].add(position)
+
+		self.failures = [0] * len(self.transitions)
+		queue = deque(self.transitions[0].values())
+		while queue:
+			state = queue.popleft()
+			for char, child in self.transitions[state].items():
+				failure = self.failures[state]
+				while failure and char not in self.transitions[failure]:
+					failure = self.failures[failure]
+				self.failures[child] = self.transitions[failure].get(char, 0)
+				# Phrases ending at the suffix state also end here
+				self.outputs[child] |= self.outputs[self.failures[child]]
+				queue.append(child)
+
+	# Method to get positions of the phrases occurring in a text
+	def find(self, text, first=False):
+		found = set()
+		if not isinstance(text, str):
+			return found
+
+		state = 0
+		for char in text.lower():
+			while state and char not in self.transitions[state]:
+				state = self.failures[state]
+			state = self.transitions[state].get(char, 0)
+			if self.outputs[state]:
+				found |= self.outputs[state]
+				if first:
+					break
+
+		return found
+
+	# Method to check whether any phrase occurs in a text
+	def contains(self, text):
+		return bool(self.find(text, first=True))
+
+	# Method to classify every entry of a series, classifying each distinct text once
+	# Returns a boolean mask of entries containing a phrase
+	def classify(self, series):
+		return schema.map_distinct(series, self.contains, False)
@@ -0,0 +1,105 @@
+'''
+This Py file is responsible for keeping the unsuccessful and doubtful labels of every response template, i.e. every distinct Response, between runs of segregate_success.
+Labels are stored in responseLabels.json along with the phrases of unsuccessful.txt and doubtful.txt they were computed with and a digest of the log data.
+When only the phrase files change, a template is checked again only if it contains a phrase which was added or removed, and only templates whose label flips are reported.
+Domain specific records of the flipped templates are written to ReclassifiedRows.csv, which doubt_resolver uses to resolve only those records.
+One class and two methods are defined below, with their purposes described in comments.
+'''
+
+import os
+import json
+import hashlib
+import pandas as pd
+import schema
+from phrase_matcher import PhraseMatcher
+
+
+# Stored labels of response templates
+labels_path = '../Intermediate Log Data/responseLabels.json'
+
+# Domain specific records whose labels changed since doubt_resolver last ran
+# An empty file means doubt_resolver is up to date, a missing one that it has to process all doubtful records
+reclassified_path = '../Intermediate Log Data/ReclassifiedRows.csv'
+
+# Phrase files, in the order of the labels of a template
+rule_files = ['unsuccessful', 'doubtful']
+
+
+# Method to read the phrases of a phrase file
+def read_phrases(path):
+
+	with open(path) as f:
+		# Removing \n from end of a response
+		return [x.strip() for x in f.readlines()]
+
+
+# Method to get a digest of the contents of dataframes
+def frame_digest(*dfs):
+
+	digest = hashlib.sha1()
+	for df in dfs:
+		digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+
+	return digest.hexdigest()
+
+
+# Class for the labels of response templates, each a list of one verdict per phrase file
+class ResponseLabels(object):
+
+	def __init__(self, path=labels_path):
+		self.path = path
+		self.labels = {}
+		self.phrases = {}
+		self.data = None
+		if os.path.exists(path):
+			with open(path) as f:
+				stored = json.load(f)
+			self.labels = stored['labels']
+			self.phrases = stored['phrases']
+			self.data = stored['data']
+
+	# Method to store labels
+	def save(self):
+		with open(self.path + '.tmp', 'w') as f:
+			json.dump({'data': self.data, 'phrases': self.phrases, 'labels': self.labels}, f)
+		os.replace(self.path + '.tmp', self.path)
+
+	# Method to label all templates from scratch
+	def classify(self, templates, phrases):
+		matchers = [PhraseMatcher(phrases[name]) for name in rule_files]
+		self.labels = {template: [matcher.contains(template) for matcher in matchers] for template in templates}
+		self.phrases = phrases
+
+	# Method to update labels for changed phrases, checking again only templates containing an added or removed phrase
+	# Returns the set of templates whose label flipped, including templates seen for the first time
+	def update(self, templates, phrases):
+		flipped = set()
+		for position, name in enumerate(rule_files):
+			old = set(phrase.lower() for phrase in self.phrases.get(name, []))
+			new = set(phrase.lower() for phrase in phrases[name])
+			if old == new:
+				continue
+
+			changed = PhraseMatcher((old | new) - (old & new))
+			matcher = PhraseMatcher(phrases[name])
+			for template, label in self.labels.items():
+				if changed.contains(template) and label[position] != matcher.contains(template):
+					label[position] = not label[position]
+					flipped.add(template)
+
+		self.phrases = phrases
+
+		# Templates which were not labelled before
+		matchers = [PhraseMatcher(phrases[name]) for name in rule_files]
+		for template in templates:
+			if template not in self.labels:
+				self.labels[template] = [matcher.contains(template) for matcher in matchers]
+				flipped.add(template)
+
+		return flipped
+
+	# Method to get boolean masks of records with unsuccessful and doubtful responses
+	def masks(self, df):
+		# Missing responses are neither unsuccessful nor doubtful
+		verdicts = schema.map_distinct(df.Response, lambda template: self.labels.get(template, [False, False]), [False, False])
+		return verdicts[:, 0], verdicts[:, 1]
@@ -0,0 +1,160 @@
+'''
+This Py file defines the schema of the log data exchanged between the stages of the analysis, along with methods to read and write it.
+Every stage reads and writes its intermediate files through read_logs and write_logs, which return and expect typed dataframes:
+	1. Timestamp fields are parsed to datetime objects
+	2. IntentName, Event and Response fields are categorical, Response being mostly a small set of canned replies
+	3. RowID fields are 64-bit integers
+Every record carries the RowID assigned to it at extraction, so differences of log data are taken with difference, by RowID.
+Intermediate files are stored as CSV by default. Setting the LOG_DATA_FORMAT environment variable to 'parquet' or 'feather' stores them in that columnar format instead, next to where the CSV file would be.
+Final outputs meant for the dashboard are written with export set, so they are always written as CSV files as well.
+'''
+
+import os
+import pandas as pd
+import numpy as np
+
+
+# Fields of a query/response record
+log_columns = ['SessionID', 'Timestamp', 'IntentName', 'Event', 'UserInput', 'Response', 'RowID']
+
+# Fields of a Task3 record, an unsuccessful record followed by a later successful (or unsuccessful) one
+task3_columns = log_columns + [column + '2' for column in log_columns]
+
+# Format of timestamps in the NSD logs
+timestamp_format = '%m/%d/%Y %I:%M:%S %p'
+
+# Categorical fields
+categorical_columns = ['IntentName', 'Event', 'Response', 'IntentName2', 'Event2', 'Response2']
+
+# Timestamp fields
+timestamp_columns = ['Timestamp', 'Timestamp2']
+
+# Record ID fields, which are not part of the contents of a record
+id_columns = ['RowID', 'RowID2']
+
+# On-disk format of intermediate files: csv, parquet or feather
+storage_format = os.environ.get('LOG_DATA_FORMAT', 'csv').lower()
+
+
+# Method to create an empty dataframe with log or Task3 fields
+def empty_frame(columns=log_columns):
+
+	return conform(pd.DataFrame(columns=columns))
+
+
+# Method to convert fields of a dataframe to their schema types
+def conform(df):
+
+	converted = {}
+
+	for column in timestamp_columns:
+		if column in df.columns and not pd.api.types.is_datetime64_any_dtype(df[column]):
+			# Fields which do not follow the log timestamp format are parsed by inference, or left as they are
+			try:
+				converted[column] = pd.to_datetime(df[column], format=timestamp_format)
+			except (ValueError, TypeError):
+				try:
+					converted[column] = pd.to_datetime(df[column])
+				except (ValueError, TypeError):
+					pass
+
+	for column in categorical_columns:
+		if column in df.columns and not isinstance(df[column].dtype, pd.CategoricalDtype):
+			converted[column] = df[column].astype('category')
+
+	for column in id_columns:
+		if column in df.columns and not pd.api.types.is_integer_dtype(df[column]):
+			# Nullable integers, so records without an ID do not turn IDs into floats
+			try:
+				converted[column] = df[column].astype('Int64')
+			except (ValueError, TypeError):
+				pass
+
+	if converted:
+		df = df.assign(**converted)
+
+	return df
+
+
+# Method to map every entry of a series, or of any sequence of values, through func, calling it once for every distinct entry
+# Returns an array of the mapped values, with the value missing for missing entries
+def map_distinct(series, func, missing, dtype=bool):
+
+	if not isinstance(series, (pd.Series, pd.Index, np.ndarray)):
+		series = pd.Series(list(series), dtype=object)
+	codes, uniques = pd.factorize(series)
+	values = np.array([func(value) for value in uniques] + [missing], dtype=dtype)
+
+	# Missing entries have code -1, which picks the trailing value
+	return values[codes]
+
+
+# Method to get the fields of a dataframe holding the contents of its records, i.e. all but record IDs
+def content_columns(df):
+
+	return [column for column in df.columns if column not in id_columns]
+
+
+# Method to get records of a dataframe which are not in another one
+# Records are compared by RowID, or by all fields shared by both dataframes when either has no RowID
+def difference(df, other):
+
+	if 'RowID' in df.columns and 'RowID' in other.columns:
+		return df[~df['RowID'].isin(other['RowID'])]
+
+	df = df.merge(other, how = 'outer' ,indicator=True).loc[lambda x : x['_merge']=='left_only']
+	return df.drop('_merge', axis=1)
+
+
+# Method to get path of the columnar copy of an intermediate CSV file
+def columnar_path(path):
+
+	return os.path.splitext(path)[0] + '.' + storage_format
+
+
+# Method to read an intermediate file as a typed dataframe
+def read_logs(path):
+
+	if storage_format != 'csv':
+		columnar = columnar_path(path)
+		# The columnar file is used unless the CSV file was written after it
+		if os.path.exists(columnar) and (not os.path.exists(path) or os.path.getmtime(columnar) >= os.path.getmtime(path)):
+			if storage_format == 'feather':
+				return conform(pd.read_feather(columnar))
+			return conform(pd.read_parquet(columnar))
+
+	return conform(pd.read_csv(path))
+
+
+# Method to write a typed dataframe to an intermediate file, or to a CSV file as well when export is set
+def write_logs(df, path, export=False):
+
+	# The CSV file is written first, so read_logs keeps reading the columnar file written after it
+	if storage_format == 'csv' or export:
+		export_csv(df, path)
+	if storage_format == 'csv':
+		return
+	if storage_format == 'feather':
+		conform(df.reset_index(drop=True)).to_feather(columnar_path(path))
+	else:
+		conform(df.reset_index(drop=True)).to_parquet(columnar_path(path), index=False)
+
+
+# Method to check whether an intermediate file exists in any format
+def logs_exist(path):
+
+	return os.path.exists(path) or os.path.exists(columnar_path(path))
+
+
+# Method to remove an intermediate file in every format
+def remove_logs(path):
+
+	for candidate in (path, columnar_path(path)):
+		if os.path.exists(candidate):
+			os.remove(candidate)
+
+
+# Method to write a dataframe to a CSV file, with timestamps in the log timestamp format
+def export_csv(df, path):
+
+	df.to_csv(path, index=False, date_format=timestamp_format)
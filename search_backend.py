@@ -0,0 +1,341 @@
+'''
+This Py file is responsible for providing the search client used by the stages of the analysis.
+By default the client is an Elasticsearch instance.
+Setting the SEARCH_BACKEND environment variable to 'local' uses LocalSearch instead, an in-process implementation of the part of the Elasticsearch query DSL used by the analysis:
+	1. match, with operator and fuzziness (AUTO or a number)
+	2. match_phrase
+	3. match_all
+	4. bool, with must, filter, should and must_not clauses
+LocalSearch serves every index from the dataframe it was loaded from, so no Elasticsearch service or manual indexing is needed.
+Hits are returned in document order, without relevance scores.
+Results of any size are read into dataframes through read_results, which pages through them with the scroll API.
+Queries with thousands of should clauses are split into batches of clauses run concurrently by read_should_results.
+Three classes and eight methods are defined below, with their purposes described in comments.
+'''
+
+import os
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+import schema
+from text_analysis import tokenize, auto_fuzziness, edit_distance
+
+
+# Search backend, 'elasticsearch' or 'local'
+backend = os.environ.get('SEARCH_BACKEND', 'elasticsearch').lower()
+
+# Number of hits fetched per scroll request by read_results
+page_size = 5000
+
+# Splitting of bool should queries by read_should_results
+clause_batch = 256 		# Maximum number of should clauses per query, well below Elasticsearch max_clause_count
+search_threads = 4 		# Number of batches run concurrently
+
+# Files loaded into LocalSearch indices, read through the log data schema except keywords
+index_sources = {
+	'logsdomain': '../Intermediate Log Data/logsDomainES.csv',
+	'domdoubt': '../Intermediate Log Data/logsDomDoubt.csv',
+	'domunsuccess': '../Intermediate Log Data/DomainUnsuccessful.csv',
+	'task3': '../Intermediate Log Data/Task3.csv',
+	'keywords': '../keywords.csv',
+}
+
+
+# Class for an inverted index over the tokens of a single field
+class FieldIndex(object):
+
+	def __init__(self, values):
+		# Tokens of every document, in order, for phrase matching
+		self.tokens = [tokenize(value) for value in values]
+		self.postings = defaultdict(set)
+		for doc, tokens in enumerate(self.tokens):
+			for token in tokens:
+				self.postings[token].add(doc)
+		self.expansions = {}
+
+	# Method to get documents containing a term, or a term within the given edit distance
+	def term_docs(self, term, fuzziness):
+		if fuzziness == 0:
+			return self.postings.get(term, set())
+
+		if (term, fuzziness) not in self.expansions:
+			docs = set()
+			for token, postings in self.postings.items():
+				if edit_distance(term, token, fuzziness) <= fuzziness:
+					docs |= postings
+			self.expansions[(term, fuzziness)] = docs
+
+		return self.expansions[(term, fuzziness)]
+
+	# Method to get documents matching a match query
+	def match(self, text, operator='or', fuzziness=None):
+		terms = tokenize(text)
+		if not terms:
+			return set()
+
+		matches = []
+		for term in terms:
+			if fuzziness is None:
+				distance = 0
+			elif str(fuzziness).upper() == 'AUTO':
+				distance = auto_fuzziness(term)
+			else:
+				distance = int(fuzziness)
+			matches.append(self.term_docs(term, distance))
+
+		if operator.lower() == 'and':
+			return set.intersection(*matches)
+		return set.union(*matches)
+
+	# Method to get documents containing all terms of the text consecutively
+	def match_phrase(self, text):
+		terms = tokenize(text)
+		if not terms:
+			return set()
+
+		candidates = set.intersection(*(self.postings.get(term, set()) for term in terms))
+		docs = set()
+		for doc in candidates:
+			tokens = self.tokens[doc]
+			for i in range(len(tokens) - len(terms) + 1):
+				if tokens[i:i + len(terms)] == terms:
+					docs.add(doc)
+					break
+
+		return docs
+
+
+# Class for a single index held in memory
+class LocalIndex(object):
+
+	def __init__(self, df):
+		self.df = df.reset_index(drop=True)
+		self.fields = {}
+		self.sources = None
+
+	# Method to get inverted index of a field, built on first use
+	def field(self, name):
+		if name not in self.fields:
+			values = self.df[name] if name in self.df.columns else pd.Series([None] * len(self.df))
+			self.fields[name] = FieldIndex(values)
+		return self.fields[name]
+
+	# Method to get _source of every document, with timestamps formatted as in the logs
+	def source(self, doc):
+		if self.sources is None:
+			df = self.df.copy()
+			for column in df.columns:
+				if pd.api.types.is_datetime64_any_dtype(df[column]):
+					df[column] = df[column].dt.strftime(schema.timestamp_format)
+			df = df.astype(object).where(df.notna(), None)
+			self.sources = df.to_dict('records')
+		return self.sources[doc]
+
+	# Method to get documents matching a query
+	def evaluate(self, query):
+		if not query or 'match_all' in query:
+			return set(range(len(self.df)))
+
+		if 'match' in query:
+			field, options = next(iter(query['match'].items()))
+			if not isinstance(options, dict):
+				options = {'query': options}
+			return self.field(field).match(options['query'], options.get('operator', 'or'), options.get('fuzziness'))
+
+		if 'match_phrase' in query:
+			field, options = next(iter(query['match_phrase'].items()))
+			if not isinstance(options, dict):
+				options = {'query': options}
+			return self.field(field).match_phrase(options['query'])
+
+		if 'bool' in query:
+			clauses = query['bool']
+			required = [self.evaluate(clause) for clause in as_list(clauses.get('must')) + as_list(clauses.get('filter'))]
+			should = as_list(clauses.get('should'))
+			if should:
+				matches = set.union(*(self.evaluate(clause) for clause in should))
+				# should clauses are optional when there are must or filter clauses
+				if not required or clauses.get('minimum_should_match'):
+					required.append(matches)
+			docs = set.intersection(*required) if required else set(range(len(self.df)))
+			for clause in as_list(clauses.get('must_not')):
+				docs = docs - self.evaluate(clause)
+			return docs
+
+		raise ValueError('Query not supported by LocalSearch: %s' % ', '.join(query))
+
+
+# Method to wrap a single clause in a list
+def as_list(clauses):
+
+	if clauses is None:
+		return []
+	if isinstance(clauses, dict):
+		return [clauses]
+	return list(clauses)
+
+
+# Method to get modification time of a file or of its columnar copy, or None if neither exists
+def modified_time(path):
+
+	for candidate in (schema.columnar_path(path), path):
+		if os.path.exists(candidate):
+			return os.path.getmtime(candidate)
+
+	return None
+
+
+# Class for an in-process search client answering the Elasticsearch queries used by the analysis
+class LocalSearch(object):
+
+	def __init__(self, sources=index_sources):
+		self.sources = dict(sources)
+		self.indices = {}
+		self.loaded = {}
+		self.versions = {}
+
+	# Method to serve a dataframe as an index
+	def index_frame(self, index, df):
+		self.indices[index] = LocalIndex(df)
+		self.loaded[index] = None
+		self.versions[index] = self.versions.get(index, 0) + 1
+
+	# Method to get a string which changes whenever the contents of an index change
+	def version(self, index):
+		if index in self.indices and self.loaded[index] is None:
+			return 'frame:%d' % self.versions[index]
+		path = self.sources.get(index)
+		mtime = modified_time(path) if path is not None else None
+		return None if mtime is None else 'file:%s:%r' % (path, mtime)
+
+	# Method to get an index, loading it from its file when the file is new or has changed
+	# Indices served with index_frame are never reloaded
+	def get_index(self, index):
+		if index in self.indices and self.loaded[index] is None:
+			return self.indices[index]
+
+		path = self.sources.get(index)
+		mtime = modified_time(path) if path is not None else None
+		if mtime is not None and (index not in self.indices or self.loaded[index] != mtime):
+			df = pd.read_csv(path) if index == 'keywords' else schema.read_logs(path)
+			self.indices[index] = LocalIndex(df)
+			self.loaded[index] = mtime
+
+		if index not in self.indices:
+			raise KeyError('Index %s does not exist' % index)
+		return self.indices[index]
+
+	# Method to get hits of a query on an index
+	def hits(self, index, body=None):
+		local = self.get_index(index)
+		query = (body or {}).get('query', {'match_all': {}})
+		for doc in sorted(local.evaluate(query)):
+			yield {'_index': index, '_id': str(doc), '_score': 1.0, '_source': local.source(doc)}
+
+	# Method to search an index, returning the first size hits like Elasticsearch search API
+	def search(self, index, body=None, size=None, **kwargs):
+		hits = list(self.hits(index, body))
+		if size is None:
+			size = (body or {}).get('size', 10)
+		return {'hits': {'total': {'value': len(hits), 'relation': 'eq'}, 'max_score': 1.0 if hits else None, 'hits': hits[:size]}}
+
+	# Method to get all hits of a query, like Elasticsearch scan helper
+	def scan(self, query=None, index=None, **kwargs):
+		return self.hits(index, query)
+
+
+# Shared LocalSearch client of this process
+local_client = None
+
+
+# Method to get the search client selected by SEARCH_BACKEND
+def get_client():
+
+	global local_client
+
+	if backend == 'local':
+		if local_client is None:
+			local_client = LocalSearch()
+		return local_client
+
+	# Elasticsearch is only needed by the elasticsearch backend
+	from elasticsearch import Elasticsearch
+	return Elasticsearch()
+
+
+# Method to get a string which changes whenever the contents of an index change, for either search client
+def index_version(client, index):
+
+	if isinstance(client, LocalSearch):
+		return client.version(index)
+
+	# Index UUID changes when the index is recreated, document and indexing counts when documents are added, updated or deleted
+	uuid = client.indices.get_settings(index=index)[index]['settings']['index']['uuid']
+	stats = client.indices.stats(index=index, metric='docs,indexing')['indices'][index]['primaries']
+
+	return '%s:%d:%d:%d' % (uuid, stats['docs']['count'], stats['docs']['deleted'], stats['indexing']['index_total'])
+
+
+# Method to iterate over all hits of a query, for either search client
+def scan(client, query, index, **kwargs):
+
+	if isinstance(client, LocalSearch):
+		return client.scan(query=query, index=index)
+
+	from elasticsearch import helpers
+	return helpers.scan(client, query=query, index=index, **kwargs)
+
+
+# Method to read all hits of a query into a typed dataframe, however many there are
+# Hits are paged through with the scroll API
+def read_results(client, index, query, columns=None, page_size=page_size, **kwargs):
+
+	# Page size of the scroll replaces any size of the query
+	query = {key: value for key, value in query.items() if key != 'size'}
+
+	return collect(scan(client, query=query, index=index, size=page_size, **kwargs), columns)
+
+
+# Method to read all hits matching any of many should clauses into a typed dataframe
+# Clauses are split into batches of batch_size, whose queries are run concurrently over the pooled connections of the client,
+# and the hits of all batches are combined with every document taken once
+def read_should_results(client, index, clauses, columns=None, batch_size=clause_batch, threads=search_threads, **kwargs):
+
+	batches = [clauses[i:i + batch_size] for i in range(0, len(clauses), batch_size)]
+
+	def run(batch):
+		query = {'query': {'bool': {'should': batch}}}
+		return [(hit['_id'], hit['_source']) for hit in scan(client, query=query, index=index, size=page_size, **kwargs)]
+
+	def union(results):
+		seen = set()
+		for hits in results:
+			for doc, source in hits:
+				if doc not in seen:
+					seen.add(doc)
+					yield {'_id': doc, '_source': source}
+
+	# LocalSearch runs in this process, where threads would only contend for the interpreter
+	if isinstance(client, LocalSearch) or threads <= 1 or len(batches) <= 1:
+		return collect(union(map(run, batches)), columns)
+
+	with ThreadPoolExecutor(max_workers=threads) as executor:
+		return collect(union(executor.map(run, batches)), columns)
+
+
+# Method to build a typed dataframe from hits, collecting their _source fields into one list per column
+# so the dataframe is built once at the end
+def collect(hits, columns=None):
+
+	buffers = {column: [] for column in columns or []}
+	count = 0
+	for hit in hits:
+		source = hit['_source']
+		for column in source:
+			if column not in buffers:
+				buffers[column] = [None] * count
+		for column, buffer in buffers.items():
+			buffer.append(source.get(column))
+		count += 1
+
+	return schema.conform(pd.DataFrame(buffers, columns=list(buffers)))
@@ -5,42 +5,31 @@ Date: 04-06-2020
 This Py file is responsible for segregating the logs into two categories:
 	1. Domain specific 
 	2. General
-Elasticsearch match query is used to segregate the logs based on the entity keywords.
-Five methods are defined below, with their purposes described in comments.
+The logs are segregated based on the entity keywords in a single pass by a local fuzzy keyword index, which matches like an Elasticsearch match query with fuzziness AUTO.
+Keyword hits of every record are computed here, before segregation, and carried along to the later stages, see keyword_hits.py.
+Four methods are defined below, with their purposes described in comments.
 Domain specific logs are stored in logsDomainES.csv.
 General logs are stored in logsGeneralES.csv.
 '''
 
-from elasticsearch import Elasticsearch, helpers
-import nltk
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
-import pandas as pd
+import search_backend
+import keyword_provider
+import schema
+import keyword_hits
+import indexer
+from fuzzy_index import KeywordClassifier
 
 
-# Creating an Elasticsearch instance
-es = Elasticsearch()
+# Creating an Elasticsearch instance, or an in-process search client when SEARCH_BACKEND is 'local'
+es = search_backend.get_client()
 
 
 # Method to get entity keywords from Elasticsearch index 'keywords'
+# Keywords are read from the index only when it has changed since they were last read, see keyword_provider.py
 def get_keywords():
 
-	print('Getting keywords from Elasticsearch \'keywords\' index...')
-	searchKey = list()
-
-	# Using match_all query to get all entity keywords
-	res = es.search(index="keywords", 
-					body={
-						"query": {
-							"match_all": {}
-						},
-						"size": 3000
-	 				})
-	print("Received %d entity keywords.\n" % res['hits']['total']['value'])
-
-	# Receieved keywords are appended to searchKey list
-	for hit in res['hits']['hits']:
-		searchKey.append("%(Attendance Marking Issue)s" % hit["_source"])
+	searchKey = keyword_provider.provider.raw()
+	print("Received %d entity keywords.\n" % len(searchKey))
 
 	return searchKey
 
@@ -49,15 +38,14 @@ def get_keywords():
 def remove_ticket():
 
 	print('Removing Ticket_Generated intent...')
-	data = pd.read_csv('../Intermediate Log Data/logsAllDict.csv')
+	data = schema.read_logs('../Intermediate Log Data/logsAllDict.csv')
 
 	# Dropping rows with NULL value in any field
 	data = data.dropna()
 
 	# Extracting a subset of dataframe by removing rows containing 'Ticket_Generated' Intent
 	data = data[data['IntentName'] != 'Ticket_Generated']
-	# Removing duplicate entries from the dataframe
-	data.drop_duplicates(keep='first',inplace=True)
+	# Duplicate entries were removed when log data was extracted, see dedup.py
 	print('Removed.\n')
 
 	return data
@@ -68,24 +56,11 @@ def keyword_prep(searchKey):
 
 	print('Preprocessing keywords...')
 
-	keywords = ''
-
-	# Creating a single string containing all entity keywords
-	for word in searchKey:
-		keywords += word + ' '
-
-	# Removing stopwords
-	stop_words = set(stopwords.words('english'))
-	word_tokens = word_tokenize(keywords)
-
-	filtered_keywords = list()
-
-	for w in word_tokens: 
-		if w not in stop_words: 
-			filtered_keywords.append(w)
-
-	# Removing duplicate words from filtered_keywords
-	filtered_keywords = list(dict.fromkeys(filtered_keywords))
+	# Removing stopwords and duplicate words, reusing the preprocessed snapshot for the keywords of the index
+	if searchKey == keyword_provider.provider.raw():
+		filtered_keywords = keyword_provider.provider.filtered()
+	else:
+		filtered_keywords = keyword_provider.filter_keywords(searchKey)
 
 	keywords = ''
 	        
@@ -98,84 +73,22 @@ def keyword_prep(searchKey):
 	return keywords
 
 
-# Method to segregate domain specific queries 
-def segregate_domain(keywords):
-
-	print('Segregating domain specific queries...')
-	# Creating new dataframe
-	df = pd.DataFrame(columns=['SessionID', 'Timestamp', 'IntentName','Event','UserInput','Response'])
-
-	# Elasticsearch match query on 'logsall' index
-	# logsall is an index containing log data after dictionary check and remove_ticket()
-	res = es.search(index="logsall",
-						body=  {
-							"query": {
-								"match": {
-									"UserInput": {
-										"query": keywords,
-										"operator": "or",
-										"fuzziness": "AUTO"
-										}
-									}
-								},
-								"size": 45000
-						}
-					)
-
-	# Results are appened to the dataframe
-	for hit in res['hits']['hits']:
-		df = df.append(hit['_source'], ignore_index=True)
-
-	# Dropping duplicate entries
-	df.drop_duplicates(keep='first',inplace=True)
-	# Writing dataframe to csv file
-	df.to_csv('../Intermediate Log Data/logsDomainES.csv', index=False)
-	df.to_csv('../To Index/logsDomainES.csv', index=False)
-
-	print('Domain specific queries successfully segregated and stored in logsDomainES.csv\n')
-
-
-# Method to segregate general queries 
-def segregate_general(keywords):
-
-	print('Segregating general queries...')
-	# Creating new dataframe
-	df2 = pd.DataFrame(columns=['SessionID', 'Timestamp', 'IntentName','Event','UserInput','Response'])
-
-	# Elasticsearch match query on 'logsall' index to get docs which do not match any of the keywords
-	res = es.search(index="logsall",
-						body=  {
-							"query": {
-	 							"bool": {
-									"must_not": [
-									{
-										"match": {
-											"UserInput": {
-												"query": keywords,
-												"operator": "or",
-												"fuzziness": "AUTO"
-											}
-										}
-									}
-									]
-								}
-							},
-							"size": 45000
-						}
-					)
-
-	# Results are appened to the dataframe
-	for hit in res['hits']['hits']:
-		df2 = df2.append(hit['_source'], ignore_index=True)
-
-	# Dropping duplicate entries
-	df2.drop_duplicates(keep='first',inplace=True)
-
-	# Writing dataframe to csv file
-	df2.to_csv('../Intermediate Log Data/logsGeneralES.csv', index=False)
-
-	print('General queries successfully segregated and stored in logsGeneralES.csv\n')
+# Method to segregate domain specific and general queries in a single pass over log data
+def segregate(data, keywords):
+
+	print('Segregating domain specific and general queries...')
+
+	# Queries with a token matching any keyword are domain specific
+	domain = KeywordClassifier(keywords).classify(data['UserInput'])
+	df = data[domain]
+	df2 = data[~domain]
+
+	# Writing dataframes to csv files
+	schema.write_logs(df, '../Intermediate Log Data/logsDomainES.csv')
+	indexer.index_frame(es, 'logsdomain', df)
+	schema.write_logs(df2, '../Intermediate Log Data/logsGeneralES.csv')
 
+	print('Queries successfully segregated and stored in logsDomainES.csv and logsGeneralES.csv\n')
 
 
 if __name__ == '__main__':
@@ -184,10 +97,11 @@ if __name__ == '__main__':
 	searchKey = get_keywords()
 	# Removing Ticket_Generated data
 	data = remove_ticket()
-	data.to_csv('../Intermediate Log Data/AllLogsFinal.csv', index=False)
+	# Computing keyword hits of every record
+	data = keyword_hits.annotate(data, searchKey)
+	schema.write_logs(data, '../Intermediate Log Data/AllLogsFinal.csv')
 	# Preprocessing keyword data
 	keywords = keyword_prep(searchKey)
-	# Segregating domain specific queries
-	segregate_domain(keywords)
-	# Segregating general queries
-	segregate_general(keywords)
+	# Segregating domain specific and general queries
+	segregate(data, keywords)
+	keyword_hits.save_state(searchKey)
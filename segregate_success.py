@@ -6,8 +6,9 @@ This Py file is responsible for segregating domain specific and general log data
 	1. Unsuccessful
 	2. Doubtful
 	3. Successful
-Pandas phrase matching is used on the Response field to achieve this.
-Two methods are defined below, with their purposes described in comments.
+Phrase matching is used on the Response field to achieve this, classifying every distinct response once (see phrase_matcher.py).
+Labels of every distinct response are kept between runs, so when only unsuccessful.txt or doubtful.txt change, only responses affected by the changed phrases are checked again (see response_labels.py).
+Records are segregated in the main block below, with its steps described in comments.
 Products of this script are:
 	1. logsDomUns.csv
 	2. GeneralUnsuccessful.csv
@@ -15,31 +16,16 @@ Products of this script are:
 	4. GeneralDoubt.csv
 	5. logsDomSuccess.csv
 	6. GeneralSuccessful.csv
+	7. ReclassifiedRows.csv, when phrases changed since the last run
 '''
 
+import sys
 import pandas as pd
 import finalise_segregation
-
-
-# Method to get unsuccessful and doubtful log data
-def segregate_success(dom, gen, responses):
-
-	dom = dom[dom.Response.str.contains('|'.join(responses), na=False, case=False)]
-	gen = gen[gen.Response.str.contains('|'.join(responses), na=False, case=False)]
-
-	return [dom, gen]
-
-
-# Method to get successful log data by taking the data that is neither doubtful nor unsuccessful
-def get_successful(data, uns, doubt):
-
-	# Concatenate unsuccessful and doubtful log data
-	notSuccess = pd.concat([uns,doubt])
-	# Take difference of total data and sum of unsuccessful and doubtful log data
-	success = data.merge(notSuccess, how = 'outer' ,indicator=True).loc[lambda x : x['_merge']=='left_only']
-	success = success.drop('_merge', axis=1)
-
-	return success
+import schema
+import response_labels
+import search_backend
+import indexer
 
 
 if __name__ == '__main__':
@@ -47,52 +33,74 @@ if __name__ == '__main__':
 	# Calling finalise_segregation's main method
 	finalise_segregation.main()
 
-	# Reading set of unsuccessful responses from unsuccessful.txt
-	with open('../unsuccessful.txt') as f:
-	    unsuccess = f.readlines()
-	# Removing \n from end of a response
-	unsuccess = [x.strip() for x in unsuccess] 
+	# Reading sets of unsuccessful and doubtful responses from unsuccessful.txt and doubtful.txt
+	phrases = {name: response_labels.read_phrases('../%s.txt' % name) for name in response_labels.rule_files}
 
 	# Reading domain specific and general data
-	dataDom = pd.read_csv('../Intermediate Log Data/DomainFinal.csv')
-	dataGen = pd.read_csv('../Intermediate Log Data/GeneralFinal.csv')
+	dataDom = schema.read_logs('../Intermediate Log Data/DomainFinal.csv')
+	dataGen = schema.read_logs('../Intermediate Log Data/GeneralFinal.csv')
+	templates = pd.unique(pd.concat([dataDom.Response.astype(object), dataGen.Response.astype(object)]).dropna())
+
+	labels = response_labels.ResponseLabels()
+	digest = response_labels.frame_digest(dataDom, dataGen)
+	if labels.data == digest:
+		# Log data is unchanged, so only templates affected by changed phrases are checked again
+		print('Reclassifying responses affected by changed phrases...')
+		flipped = labels.update(templates, phrases)
+		print('%d response templates reclassified.\n' % len(flipped))
+		if not flipped:
+			# Outputs are unaffected, only the phrases of the labels are updated
+			labels.save()
+			print('Segregation is up to date.')
+			sys.exit()
+
+		# Adding records of flipped templates to those doubt_resolver has not processed yet, unless it has to process all of them
+		if schema.logs_exist(response_labels.reclassified_path):
+			pending = schema.read_logs(response_labels.reclassified_path)
+			flipped |= set(pending.Response.dropna().astype(str))
+			schema.write_logs(dataDom[dataDom.Response.isin(flipped)], response_labels.reclassified_path)
+	else:
+		print('Classifying responses...')
+		labels.classify(templates, phrases)
+		labels.data = digest
+		# doubt_resolver has to process all doubtful records
+		schema.remove_logs(response_labels.reclassified_path)
+		print('%d response templates classified.\n' % len(templates))
+
+	# Labelling every record by its response template
+	domUnsMask, domDoubtMask = labels.masks(dataDom)
+	genUnsMask, genDoubtMask = labels.masks(dataGen)
 
 	print('Segregating unsuccessful queries...')
 	# Getting unsuccessfully answered data
-	res = segregate_success(dataDom, dataGen, unsuccess)
-	domUns = res[0]
-	genUns = res[1]
+	domUns = dataDom[domUnsMask]
+	genUns = dataGen[genUnsMask]
 	# Writing to CSV files
-	domUns.to_csv('../Intermediate Log Data/logsDomUns.csv', index=False)
-	genUns.to_csv('../Final Tasks Log Data/GeneralUnsuccessful.csv', index=False)
+	schema.write_logs(domUns, '../Intermediate Log Data/logsDomUns.csv')
+	schema.write_logs(genUns, '../Final Tasks Log Data/GeneralUnsuccessful.csv', export=True)
 
 	print('Segregation successful. \nData stored in logsDomUns.csv and GeneralUnsuccessful.csv.\n')
 
-	# Reading set of doubtful responses from doubtful.txt
-	with open('../doubtful.txt') as f:
-	    doubtful = f.readlines()
-	# Removing \n from end of a response
-	doubtful = [x.strip() for x in doubtful] 
-
 	print('Segregating doubtful queries...')
 	# Getting doubtful data
-	res = segregate_success(dataDom, dataGen, doubtful)
-	domDoubt = res[0]
-	genDoubt = res[1]
+	domDoubt = dataDom[domDoubtMask]
+	genDoubt = dataGen[genDoubtMask]
 	# Writing to CSV files
-	domDoubt.to_csv('../Intermediate Log Data/logsDomDoubt.csv', index=False)
-	domDoubt.to_csv('../To Index/logsDomDoubt.csv', index=False)
-	genDoubt.to_csv('../Intermediate Log Data/GeneralDoubt.csv', index=False)
+	schema.write_logs(domDoubt, '../Intermediate Log Data/logsDomDoubt.csv')
+	indexer.index_frame(search_backend.get_client(), 'domdoubt', domDoubt)
+	schema.write_logs(genDoubt, '../Intermediate Log Data/GeneralDoubt.csv')
 
 	print('Segregation successful. \nData stored in logsDomDoubt.csv and GeneralDoubt.csv.\n')
 
 	
 	print('Segregating successful queries...')
-	# Getting successfully answered data
-	domSuccess = get_successful(dataDom, domUns, domDoubt)
-	genSuccess = get_successful(dataGen, genUns, genDoubt)
+	# Getting successfully answered data, which is neither doubtful nor unsuccessful
+	domSuccess = dataDom[~(domUnsMask | domDoubtMask)]
+	genSuccess = dataGen[~(genUnsMask | genDoubtMask)]
 	# Writing to CSV files
-	domSuccess.to_csv('../Intermediate Log Data/logsDomSuccess.csv', index=False)
-	genSuccess.to_csv('../Final Tasks Log Data/GeneralSuccessful.csv', index=False)
+	schema.write_logs(domSuccess, '../Intermediate Log Data/logsDomSuccess.csv')
+	schema.write_logs(genSuccess, '../Final Tasks Log Data/GeneralSuccessful.csv', export=True)
 	print('Segregation successful. \nData stored in logsDomSuccess.csv and GeneralSuccessful.csv.\n')
 
+	# Storing labels once all outputs are written, so an interrupted run is repeated in full the next time
+	labels.save()
@@ -3,78 +3,89 @@ Author: Varun Chopra
 Date: 04-06-2020
 
 This Py file is responsible for segregating unsuccessfully answered domain specific log data into queries which could not be answered at first but were successfully answered later on.
-Elasticsearch match_phrase query is used on unsuccessful and successful log data.
-Timestamps are then compared and the unsuccessful-successful log pair with successful timestamp greater than unsuccessful are appended to dataframe.
-One method is defined below, with its purpose described in comments.
-Data is stored in Task3.csv.
+Every unsuccessful query is matched as a phrase, like an Elasticsearch match_phrase query, against the queries of successful and unsuccessful log data at once, using an in-process token position index.
+Timestamps are then compared for all matching pairs together, and the pairs where the later record has a greater timestamp than the unsuccessful one are kept.
+Pairs with a later successful record make up Task3, pairs with a later unsuccessful record make up Task3Neg.
+Two methods are defined below, with their purposes described in comments.
+Data is stored in Task3.csv and Task3Neg.csv.
 '''
 
-from elasticsearch import Elasticsearch, helpers
+import search_backend
 import pandas as pd
-from datetime import datetime
-import segregate_domain as sd
+import numpy as np
+import schema
+import keyword_hits
+import indexer
 
 
-# Creating an Elasticsearch instance
-es = Elasticsearch()
+# Creating an Elasticsearch instance, or an in-process search client when SEARCH_BACKEND is 'local'
+es = search_backend.get_client()
 
 
-# Method to get log data which could not be answered at first but was successfully answered later on
-def improvement_check(domUns, domIndex):
+# Method to get timestamps of log data as int64 nanoseconds, missing timestamps being the smallest int64 value
+def timestamps(df):
 
-	df = pd.DataFrame(columns=['SessionID', 'Timestamp', 'IntentName','Event','UserInput','Response','SessionID2', 'Timestamp2', 'IntentName2','Event2','UserInput2','Response2'])
+	return pd.to_datetime(df['Timestamp']).to_numpy(dtype='datetime64[ns]').view('int64')
 
-	# Iterating through every row in domUns and running match_phrase query on 'domsuccess' index
-	for index, row in domUns.iterrows(): 
-		res = es.search(index=domIndex,
-	    					body= {
-	    						"query": {
-									"match_phrase": {
-										"UserInput": {
-											"query": row['UserInput']
-										}
-									}
-								}
-							}
-						)
-	    
-		for hit in res['hits']['hits']:
 
-			# Converting timestamps to datetime objects for comparison
-			timestampUns = datetime.strptime(row['Timestamp'], '%m/%d/%Y %I:%M:%S %p')
-			timestampSuc = datetime.strptime(hit['_source']['Timestamp'], '%m/%d/%Y %I:%M:%S %p')
-	        
-	        # Comparing timestamps
-			if timestampSuc > timestampUns:
-	            # Append both unsuccessful and subsequently successful log data to dataframe
-				to_append = list(row) + list(hit['_source'].values())
+# Method to get log data which could not be answered at first but was answered later on
+# Returns pairs of unsuccessful queries with later successful records (Task3) and with later unsuccessful records (Task3Neg)
+def improvement_check(domUns, domSuc):
 
-				df_length = len(df)
-				df.loc[df_length] = to_append
-	# Dropping duplicate entries
-	df.drop_duplicates(keep='first',inplace=True)
+	domUns = domUns.reset_index(drop=True)
+	# Records which may answer an unsuccessful query later on, successful ones first
+	later = pd.concat([domSuc, domUns], ignore_index=True)
+	phrases = search_backend.FieldIndex(later['UserInput'])
 
-	return df
+	# Matching every distinct unsuccessful query once
+	codes, queries = pd.factorize(domUns['UserInput'])
+	matches = [np.array(sorted(phrases.match_phrase(query)), dtype=np.int64) for query in queries]
+	pairs = pd.DataFrame({
+		'code': np.repeat(np.arange(len(queries)), [len(docs) for docs in matches]),
+		'doc': np.concatenate(matches) if matches else np.array([], dtype=np.int64),
+	})
 
+	# Candidate pairs of every unsuccessful record with every record matching its query
+	candidates = pd.DataFrame({'code': codes, 'row': np.arange(len(domUns))}).merge(pairs, on='code')
+	candidates = candidates.sort_values(['row', 'doc'], kind='stable')
 
+	# Keeping pairs where the later record has a greater timestamp
+	nat = np.iinfo(np.int64).min
+	first = timestamps(domUns)[candidates['row'].to_numpy()]
+	second = timestamps(later)[candidates['doc'].to_numpy()]
+	candidates = candidates[(second > first) & (first != nat) & (second != nat)]
 
-if __name__ == '__main__':
+	# Keyword hits of the unsuccessful record are kept for final_filter
+	hits = [column for column in keyword_hits.hit_fields.values() if column in domUns.columns]
 
-	# Reading unsuccessful domain specific data
-	domUns = pd.read_csv('../Intermediate Log Data/DomainUnsuccessful.csv')
+	results = []
+	for successful in (candidates['doc'] < len(domSuc), candidates['doc'] >= len(domSuc)):
+		selected = candidates[successful.to_numpy()]
+		unsuccessful = domUns.iloc[selected['row'].to_numpy()].reset_index(drop=True)
+		answer = later.iloc[selected['doc'].to_numpy()][schema.log_columns].reset_index(drop=True)
+		answer.columns = [column + '2' for column in schema.log_columns]
 
-	print('Segregating domain specific queries that could not be answered at first but were answered successfully later on...')
-	# Calling improvement_check method
-	task3 = improvement_check(domUns, 'domsuccess')
+		df = pd.concat([unsuccessful[schema.log_columns], answer, unsuccessful[hits]], axis=1)
+		# Pairs are unique, since every unsuccessful record and every later record is unique
+		results.append(schema.conform(df))
 
-	# Writing to CSV file
-	task3.to_csv('../Intermediate Log Data/Task3.csv', index=False)
-	task3.to_csv('../To Index/Task3.csv', index=False)
+	return results
 
-	# Getting queries which could still not be answered on a later try
-	task3neg = improvement_check(domUns, 'domunsuccess')
-	task3neg.to_csv('../Intermediate Log Data/Task3Neg.csv', index=False)
 
-	print('Segregation successful. Data stored in Task3.csv.')
 
+if __name__ == '__main__':
+
+	# Reading unsuccessful and successful domain specific data
+	domUns = schema.read_logs('../Intermediate Log Data/DomainUnsuccessful.csv')
+	domSuc = schema.read_logs('../Intermediate Log Data/DomainSuccessful.csv')
+
+	print('Segregating domain specific queries that could not be answered at first but were answered successfully later on...')
+	# Calling improvement_check method, which also gets queries which could still not be answered on a later try
+	task3, task3neg = improvement_check(domUns, domSuc)
+
+	# Writing to CSV files
+	schema.write_logs(task3, '../Intermediate Log Data/Task3.csv')
+	indexer.index_frame(es, 'task3', task3)
+	schema.write_logs(task3neg, '../Intermediate Log Data/Task3Neg.csv')
 
+	print('Segregation successful. Data stored in Task3.csv and Task3Neg.csv.')
@@ -0,0 +1,59 @@
+import csv
+import pytest
+
+from anonymisation import Anonymiser, anonymise
+
+
+@pytest.mark.parametrize('text, expected', [
+	('mail me at john.doe99@gmail.com', 'mail me at abc@xyz.com'),
+	('call 9876543210 now', 'call 9XXXXXXXXX now'),
+	('call 919876543210 or +919876543210', 'call 9XXXXXXXXX or 9XXXXXXXXX'),
+	('aadhaar 2345 6789 0123 and 234567890123', 'aadhaar XXXXXXXXXXXX and XXXXXXXXXXXX'),
+	('pan ABCDE1234F', 'pan XXXXX0000X'),
+	('server 10.0.0.12 is down', 'server X.X.X.X is down'),
+	('how to apply leave', 'how to apply leave'),
+])
+def test_rules(text, expected):
+	assert anonymise(text) == expected
+
+
+def test_earlier_rules_take_precedence():
+	# Digits of an email address are not taken for a phone number
+	assert anonymise('9876543210@gmail.com') == 'abc@xyz.com'
+
+	anonymiser = Anonymiser()
+	# Of rules matching at the same position, the rule added last is tried last
+	anonymiser.add_rule('ticket', r'[0-9]{10}[A-Z]', 'TICKET')
+	assert anonymiser.anonymise('9876543210A') == '9XXXXXXXXXA'
+	# Adding a rule again moves it after the other rules, replacing its pattern
+	anonymiser.add_rule('email', r'[a-z]+@nic\.in', 'abc@xyz.com')
+	assert anonymiser.anonymise('a@nic.in b@gmail.com') == 'abc@xyz.com b@gmail.com'
+
+
+def test_rules_must_not_capture():
+	with pytest.raises(ValueError):
+		Anonymiser([('phone', r'([0-9]{10})', '9XXXXXXXXX')])
+
+
+def test_anonymise_csv_is_idempotent(tmp_path):
+	path = str(tmp_path / 'logs.csv')
+	rows = [
+		['SessionID', 'UserInput', 'Response'],
+		['9876543210', 'my number is +919876543210, mail a@b.com', 'PAN ABCDE1234F, IP 10.0.0.1'],
+		['s2', 'aadhaar 2345-6789-0123', 'Ok'],
+	]
+	with open(path, 'w', newline='') as f:
+		csv.writer(f).writerows(rows)
+
+	Anonymiser().anonymise_csv(path)
+	with open(path, newline='') as f:
+		once = list(csv.reader(f))
+	assert once == [
+		rows[0],
+		['9876543210', 'my number is 9XXXXXXXXX, mail abc@xyz.com', 'PAN XXXXX0000X, IP X.X.X.X'],
+		['s2', 'aadhaar XXXXXXXXXXXX', 'Ok'],
+	]
+
+	Anonymiser().anonymise_csv(path)
+	with open(path, newline='') as f:
+		assert list(csv.reader(f)) == once
@@ -0,0 +1,58 @@
+import random
+import pytest
+
+from dedup import BloomFilter, ExactFilter, Deduplicator, fingerprint
+
+
+def test_fingerprint_separates_fields():
+	assert fingerprint(['a', 'b']) == fingerprint(('a', 'b'))
+	assert fingerprint(['ab', '']) != fingerprint(['a', 'b'])
+	assert fingerprint([None, 1]) == fingerprint(['', '1'])
+
+
+def test_bloom_filter_has_no_false_negatives_and_bounded_false_positives():
+	generator = random.Random(3)
+	capacity, error_rate = 20000, 0.01
+	bloom = BloomFilter(capacity, error_rate)
+	fingerprints = [generator.getrandbits(64) for _ in range(2 * capacity)]
+
+	false_positives = sum(bloom.seen(fp) for fp in fingerprints[:capacity])
+	assert false_positives <= 2 * error_rate * capacity
+	assert all(bloom.seen(fp) for fp in fingerprints[:capacity])
+
+	exact = ExactFilter()
+	assert [exact.seen(fp) for fp in fingerprints[:100]] == [False] * 100
+	assert all(exact.seen(fp) for fp in fingerprints[:100])
+
+
+@pytest.mark.parametrize('mode', ['exact', 'bloom'])
+def test_deduplicator_keeps_first_record(mode):
+	records = [
+		('s1', 'ts1', 'hi', 'hello', 1),
+		('s2', 'ts2', 'hi', 'hello', 2),
+		('s1', 'ts1', 'hi', 'hello', 3),
+		('s1', 'ts1', 'hi', None, 4),
+		('s1', 'ts1', 'hi', '', 5),
+	]
+	deduplicator = Deduplicator(fields=[0, 1, 2, 3], mode=mode)
+	assert [record[-1] for record in deduplicator.unique(records)] == [1, 2, 4]
+	assert deduplicator.dropped == 2
+
+
+@pytest.mark.parametrize('keep, kept', [('first', [1, 2, 5]), ('last', [2, 4, 6]), ('none', [2])])
+def test_deduplicator_keep(keep, kept):
+	records = [('a', 1), ('b', 2), ('a', 3), ('a', 4), ('c', 5), ('c', 6)]
+	# The second field is left out of the contents
+	deduplicator = Deduplicator(fields=[0], mode='exact', keep=keep)
+	assert [record[1] for record in deduplicator.unique(iter(records))] == kept
+	assert deduplicator.dropped == len(records) - len(kept)
+
+
+def test_unknown_options_raise():
+	with pytest.raises(ValueError):
+		Deduplicator(fields=[0], mode='fuzzy')
+	with pytest.raises(ValueError):
+		Deduplicator(fields=[0], keep='any')
+	# A Bloom filter cannot tell which records a fingerprint came from
+	with pytest.raises(ValueError):
+		Deduplicator(fields=[0], mode='bloom', keep='last')
@@ -0,0 +1,53 @@
+import pytest
+
+pd = pytest.importorskip('pandas')
+pytest.importorskip('requests')
+pytest.importorskip('aiohttp')
+
+import dictionary
+from dictionary import Checkpoint
+
+
+def test_checkpoint_resumes_completed_chunks(tmp_path):
+	path = str(tmp_path / 'checkpoint.jsonl')
+	checkpoint = Checkpoint(path, 'key')
+	checkpoint.save(0, 3, [True, False, True])
+	checkpoint.save(3, 5, [False, False])
+	# A crash while writing the last chunk leaves a partial line
+	with open(path, 'a') as f:
+		f.write('{"start": 5, "end"')
+
+	resumed = Checkpoint(path, 'key')
+	assert list(resumed.get(0, 3)) == [True, False, True]
+	assert list(resumed.get(3, 5)) == [False, False]
+	assert resumed.get(5, 7) is None
+
+	# The partial line is dropped, so chunks saved after resuming are read back
+	resumed.save(5, 7, [True, True])
+	assert list(Checkpoint(path, 'key').get(5, 7)) == [True, True]
+
+	resumed.remove()
+	assert Checkpoint(path, 'key').done == {}
+
+
+def test_checkpoint_of_other_queries_is_discarded(tmp_path):
+	path = str(tmp_path / 'checkpoint.jsonl')
+	Checkpoint(path, dictionary.checkpoint_key(['how to apply leave'])).save(0, 1, [True])
+
+	assert Checkpoint(path, dictionary.checkpoint_key(['how to apply leave'])).done
+	assert not Checkpoint(path, dictionary.checkpoint_key(['attendance not marked'])).done
+
+
+def test_completed_check_is_taken_from_checkpoint(tmp_path):
+	df = pd.DataFrame({'UserInput': ['query %d' % i for i in range(10)]})
+	checkpoint = Checkpoint(str(tmp_path / 'checkpoint.jsonl'), 'key')
+	chunk_size = max(1, min(dictionary.chunk_rows, -(-len(df) // (dictionary.num_cores * 4))))
+	for start in range(0, len(df), chunk_size):
+		end = min(start + chunk_size, len(df))
+		checkpoint.save(start, end, [i % 3 == 0 for i in range(start, end)])
+
+	# No chunk is checked again
+	def check(queries):
+		raise AssertionError('completed chunk checked again')
+
+	assert list(dictionary.parallelize_dataframe(df, check, checkpoint)) == [i % 3 == 0 for i in range(10)]
@@ -0,0 +1,33 @@
+import random
+import pytest
+
+pd = pytest.importorskip('pandas')
+
+from fuzzy_index import FuzzyIndex, KeywordClassifier
+from text_analysis import auto_fuzziness, edit_distance
+
+
+def test_lookup_matches_brute_force():
+	generator = random.Random(11)
+	word = lambda: ''.join(generator.choice('abcd') for _ in range(generator.randint(1, 7)))
+	terms = set(word() for _ in range(200))
+	index = FuzzyIndex(terms)
+
+	for _ in range(2000):
+		token = word()
+		expected = set(term for term in terms if edit_distance(term, token, auto_fuzziness(term)) <= auto_fuzziness(term))
+		assert index.lookup(token) == expected
+
+
+def test_fuzziness_follows_the_keyword():
+	index = FuzzyIndex(['attendance', 'leave', 'id'])
+	assert index.lookup('attendence') == {'attendance'}
+	assert index.lookup('attnedance') == {'attendance'}
+	assert index.lookup('laeve') == {'leave'}
+	assert not index.matches('is')
+	assert not index.matches('lea')
+
+
+def test_classifier():
+	classifier = KeywordClassifier('attendance leave')
+	assert list(classifier.classify(pd.Series(['my attendence', 'apply leav', 'hello', None, 'hello']))) == [True, True, False, False, False]
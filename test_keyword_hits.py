@@ -0,0 +1,45 @@
+import random
+import pytest
+
+pd = pytest.importorskip('pandas')
+
+import keyword_hits
+from keyword_hits import KeywordMatcher
+from search_backend import FieldIndex
+
+
+vocabulary = ['attendance', 'attendence', 'marked', 'leave', 'leav', 'biometric', 'id', 'is', 'not', 'note', 'portal', 'protal']
+keywords = ['attendance', 'leave portal', 'biometric id', 'not marked', 'Leave']
+
+
+def test_hits_match_keyword_search():
+	generator = random.Random(2)
+	texts = [' '.join(generator.choice(vocabulary) for _ in range(generator.randint(0, 5))) for _ in range(500)]
+	matcher = KeywordMatcher(keywords)
+	index = FieldIndex(texts)
+
+	expected = [0] * len(texts)
+	for position, keyword in enumerate(keywords):
+		# Match query of KeywordSearch
+		for doc in index.match(keyword, operator='and', fuzziness='AUTO'):
+			expected[doc] |= 1 << position
+
+	assert [matcher.hits(text) for text in texts] == expected
+
+
+def test_hit_masks(tmp_path, monkeypatch):
+	monkeypatch.setattr(keyword_hits, 'state_path', str(tmp_path / 'keywordHits.json'))
+	df = pd.DataFrame({
+		'UserInput': ['attendence not marked', 'hello', None, 'leave'],
+		'Response': ['check the biometric id', 'hello', 'leave portal', 'leave portal'],
+	})
+
+	df = keyword_hits.annotate(df, keywords)
+	assert list(df['UserInputHits']) == ['0x9', '0x0', '0x0', '0x10']
+	assert list(keyword_hits.any_hit(df)) == [True, False, False, True]
+	assert list(keyword_hits.shared_hit(df)) == [False, False, False, True]
+
+	assert not keyword_hits.is_current(df, keywords)
+	keyword_hits.save_state(keywords)
+	assert keyword_hits.is_current(df, keywords)
+	assert not keyword_hits.is_current(df, keywords[::-1])
@@ -0,0 +1,140 @@
+import os
+import csv
+import gzip
+import zipfile
+import pytest
+import log_extraction
+from dedup import Deduplicator
+
+
+# Method to get the contents of a session file with the given query/response pairs
+def chat(pairs):
+
+	segments = []
+	for minute, (intent, query, response) in enumerate(pairs):
+		segments += ['#%s:Event' % intent, '5/2/2020 11:%02d:00 PM#User:%s' % (minute, query), 'Vani:%s' % response]
+
+	return '||'.join(segments)
+
+
+# Method to write a session file of a chat
+def write_session(directory, session, pairs):
+
+	path = os.path.join(str(directory), '%s-WebChatBot.txt' % session)
+	with open(path, 'w') as f:
+		f.write(chat(pairs))
+
+	return path
+
+
+# Method to write count session files of one to four query/response pairs
+def sessions(directory, count):
+
+	for i in range(count):
+		write_session(directory, 's%02d' % i, [('Intent%d' % j, 'query %d of %d' % (j, i), 'answer %d' % j) for j in range(i % 4 + 1)])
+
+
+def test_parse_chat():
+	records = list(log_extraction.parse_chat('s1', chat([('Leave', 'how to apply leave', 'Sorry'), ('Leave', 'leave balance', 'Ok')]).split('||')))
+
+	assert [record[:6] for record in records] == [
+		['s1', '5/2/2020 11:00:00 PM', 'Leave', 'Event', 'how to apply leave', 'Sorry'],
+		['s1', '5/2/2020 11:01:00 PM', 'Leave', 'Event', 'leave balance', 'Ok'],
+	]
+	assert records[1][6] == log_extraction.row_id('s1', '5/2/2020 11:01:00 PM', 1)
+
+
+@pytest.mark.parametrize('newline', ['\r\n', '\r', '\n'])
+def test_line_breaks_are_removed(tmp_path, newline):
+	pairs = [('Leave', 'how to apply leave', 'Sorry'), ('Greetings', 'hi', 'Hello'), ('Leave', 'leave balance', 'Ok')]
+	segments = chat(pairs).replace('#Greetings:Event', '#Greetings').split('||')
+	expected = list(log_extraction.parse_chat('s1', segments))
+	assert [record[4] for record in expected] == ['how to apply leave', 'leave balance']
+
+	# Line breaks at the ends of segments and inside them
+	text = ('||' + newline).join(segments).replace('how to ', 'how to ' + newline)
+	path = str(tmp_path / 's1-WebChatBot.txt')
+	with open(path, 'w', newline='') as f:
+		f.write(text)
+	with gzip.open(path + '.gz', 'wb') as f:
+		f.write(text.encode('utf-8'))
+
+	assert list(log_extraction.iter_file_records(path)) == expected
+	assert list(log_extraction.iter_file_records(path + '.gz')) == expected
+
+
+def test_pool_output_matches_serial_output(tmp_path):
+	logs_dir = tmp_path / 'logs'
+	logs_dir.mkdir()
+	sessions(logs_dir, 40)
+	# A repeated record, with the same timestamp, is dropped in both runs
+	with open(str(logs_dir / 'dup-WebChatBot.txt'), 'w') as f:
+		f.write('||'.join(chat([('A', 'same', 'same')]).split('||') * 2))
+	logs = log_extraction.traverse_directory(str(logs_dir))
+
+	outputs = []
+	for processes in (1, 3):
+		output = str(tmp_path / ('serial%d.csv' % processes))
+		count = log_extraction.extract_queries(logs, output, processes=processes, manifest=output + '.manifest')
+		with open(output, 'rb') as f:
+			outputs.append(f.read())
+
+	assert count == 40 + sum(i % 4 for i in range(40)) + 1
+	assert outputs[0] == outputs[1]
+
+
+# Method to get the header and the sorted records of an extracted CSV file
+def read_rows(path):
+
+	with open(path, newline='') as f:
+		reader = csv.reader(f)
+		return next(reader), sorted(reader)
+
+
+def test_incremental_extraction_matches_full_rebuild(tmp_path):
+	logs_dir = tmp_path / 'logs'
+	logs_dir.mkdir()
+	sessions(logs_dir, 10)
+	archive = str(logs_dir / 'archive.zip')
+	with zipfile.ZipFile(archive, 'w') as f:
+		f.writestr('z1-WebChatBot.txt', chat([('A', 'zip query', 'zip answer')]))
+		f.writestr('z2-WebChatBot.txt', chat([('A', 'zip query two', 'zip answer')]))
+
+	output = str(tmp_path / 'incremental.csv')
+	manifest = output + '.manifest'
+	log_extraction.extract_queries(log_extraction.traverse_directory(str(logs_dir)), output, manifest=manifest)
+
+	# Adding, changing and removing session files and changing the archive
+	write_session(logs_dir, 'new', [('B', 'new query', 'new answer')])
+	write_session(logs_dir, 's03', [('C', 'changed query', 'changed answer'), ('C', 'another changed query', 'answer')])
+	os.remove(str(logs_dir / 's05-WebChatBot.txt'))
+	with zipfile.ZipFile(archive, 'w') as f:
+		f.writestr('z1-WebChatBot.txt', chat([('A', 'zip query', 'zip answer'), ('A', 'zip follow up', 'answer')]))
+
+	logs = log_extraction.traverse_directory(str(logs_dir))
+	count = log_extraction.extract_queries(logs, output, manifest=manifest)
+	# Only the new and changed files are extracted again
+	assert count == 1 + 2 + 2
+
+	full = str(tmp_path / 'full.csv')
+	log_extraction.extract_queries(logs, full, manifest=full + '.manifest', full=True)
+
+	assert read_rows(output) == read_rows(full)
+	assert not any(row[0] in ('s05', 'z2') for row in read_rows(output)[1])
+
+
+@pytest.mark.parametrize('keep, kept', [('last', ['a', 'b', 'c', 'd']), ('none', ['b', 'd'])])
+def test_drop_duplicate_records(tmp_path, keep, kept):
+	output = str(tmp_path / 'logs.csv')
+	with log_extraction.CSVSink(output) as sink:
+		for i, query in enumerate(['a', 'a', 'b', 'c', 'd', 'c']):
+			sink.write(['s1', 'ts', 'Intent', '', query, 'answer', 'id%d' % i])
+
+	deduplicator = Deduplicator(fields=range(len(log_extraction.header) - 1), keep=keep)
+	assert log_extraction.drop_duplicate_records(output, deduplicator) == len(kept)
+
+	header, rows = read_rows(output)
+	assert header == log_extraction.header
+	assert [row[4] for row in rows] == kept
+	if keep == 'last':
+		assert [row[6] for row in rows] == ['id1', 'id2', 'id5', 'id4']
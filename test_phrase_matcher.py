@@ -0,0 +1,33 @@
+import random
+import pytest
+
+pd = pytest.importorskip('pandas')
+
+from phrase_matcher import PhraseMatcher
+
+
+def test_find_matches_brute_force():
+	generator = random.Random(5)
+	text = lambda low, high: ''.join(generator.choice('abAB') for _ in range(generator.randint(low, high)))
+
+	for _ in range(300):
+		matcher = PhraseMatcher([text(0, 4) for _ in range(generator.randint(0, 8))])
+		for _ in range(10):
+			sample = text(0, 20)
+			expected = set(position for position, phrase in enumerate(matcher.phrases) if phrase in sample.lower())
+			assert matcher.find(sample) == expected
+			assert matcher.contains(sample) == bool(expected)
+
+
+def test_phrases_are_literal_and_ignore_case():
+	matcher = PhraseMatcher(['Sorry, I did not understand.', '(beta)', 'sorry', ''])
+	assert matcher.phrases == ['sorry, i did not understand.', '(beta)', 'sorry']
+	assert matcher.find('SORRY, I did not understand. Try again') == {0, 2}
+	assert matcher.find('the (beta) version') == {1}
+	assert not matcher.contains('the beta version')
+	assert not matcher.contains(None)
+
+
+def test_classify():
+	matcher = PhraseMatcher(['try again'])
+	assert list(matcher.classify(pd.Series(['Please try again', 'Done', None, 'please TRY AGAIN']))) == [True, False, False, True]
@@ -0,0 +1,78 @@
+import pytest
+
+pd = pytest.importorskip('pandas')
+
+import search_backend
+from search_backend import LocalSearch
+
+
+queries = [
+	'my attendance is not marked',
+	'attendence not marking',
+	'biometric device not working',
+	'how to apply leave',
+	'not marked',
+	None,
+]
+
+
+@pytest.fixture
+def client():
+	client = LocalSearch(sources={})
+	client.index_frame('logs', pd.DataFrame({'UserInput': queries, 'Response': ['r%d' % i for i in range(len(queries))]}))
+	return client
+
+
+# Method to get positions of the documents matching a query
+def docs(client, query):
+	return [int(hit['_id']) for hit in client.scan(query={'query': query}, index='logs')]
+
+
+def test_match_or_and_and(client):
+	assert docs(client, {'match': {'UserInput': 'attendance leave'}}) == [0, 3]
+	assert docs(client, {'match': {'UserInput': {'query': 'not marked', 'operator': 'and'}}}) == [0, 4]
+
+
+def test_match_fuzziness_auto(client):
+	query = {'match': {'UserInput': {'query': 'attendance', 'fuzziness': 'AUTO'}}}
+	# attendence is one edit from attendance, which allows two edits
+	assert docs(client, query) == [0, 1]
+	# marking is three edits from marked, which allows two edits
+	assert docs(client, {'match': {'UserInput': {'query': 'marked', 'fuzziness': 'AUTO'}}}) == [0, 4]
+	# Terms of up to two characters must match exactly
+	assert docs(client, {'match': {'UserInput': {'query': 'mi', 'fuzziness': 'AUTO'}}}) == []
+
+
+def test_match_phrase(client):
+	assert docs(client, {'match_phrase': {'UserInput': 'not marked'}}) == [0, 4]
+	assert docs(client, {'match_phrase': {'UserInput': 'marked not'}}) == []
+
+
+def test_bool(client):
+	assert docs(client, {'bool': {'must_not': [{'match': {'UserInput': 'not'}}]}}) == [3, 5]
+	# should clauses are optional next to must clauses
+	assert docs(client, {'bool': {'must': [{'match': {'UserInput': 'marked'}}], 'should': [{'match': {'UserInput': 'leave'}}]}}) == [0, 4]
+	assert docs(client, {'bool': {'should': [{'match': {'UserInput': 'leave'}}, {'match': {'UserInput': 'biometric'}}]}}) == [2, 3]
+	assert docs(client, {'match_all': {}}) == list(range(len(queries)))
+
+
+def test_unsupported_query_raises(client):
+	with pytest.raises(ValueError):
+		docs(client, {'regexp': {'UserInput': 'a.*'}})
+
+
+def test_search_returns_ten_hits_by_default():
+	client = LocalSearch(sources={})
+	client.index_frame('logs', pd.DataFrame({'UserInput': ['leave'] * 25}))
+	result = client.search(index='logs', body={'query': {'match': {'UserInput': 'leave'}}})
+	assert result['hits']['total']['value'] == 25
+	assert len(result['hits']['hits']) == 10
+
+
+def test_read_should_results_unions_batches(client):
+	clauses = [{'match': {'UserInput': word}} for word in ['not', 'marked', 'leave', 'not']]
+	df = search_backend.read_should_results(client, 'logs', clauses, columns=['UserInput', 'Response'], batch_size=1)
+	assert list(df['Response']) == ['r0', 'r1', 'r2', 'r4', 'r3']
+
+	df = search_backend.read_results(client, 'logs', {'query': {'match': {'UserInput': 'not'}}, 'size': 1})
+	assert list(df['Response']) == ['r0', 'r1', 'r2', 'r4']
@@ -0,0 +1,53 @@
+import random
+import pytest
+
+pd = pytest.importorskip('pandas')
+
+import search_backend
+# task3 creates its search client on import
+search_backend.backend = 'local'
+
+import schema
+import task3
+from text_analysis import tokenize
+
+
+# Method to get random log data with RowIDs from first_id on
+def logs(generator, count, first_id):
+
+	words = ['leave', 'attendance', 'not', 'marked', 'apply']
+	return schema.conform(pd.DataFrame({
+		'SessionID': ['s%d' % generator.randint(0, 3) for _ in range(count)],
+		'Timestamp': [None if generator.random() < 0.1 else pd.Timestamp(2020, 6, 1, 10, generator.randint(0, 20)) for _ in range(count)],
+		'IntentName': ['Intent'] * count,
+		'Event': [''] * count,
+		'UserInput': [' '.join(generator.choice(words) for _ in range(generator.randint(0, 3))) for _ in range(count)],
+		'Response': ['answer %d' % generator.randint(0, 2) for _ in range(count)],
+		'RowID': range(first_id, first_id + count),
+	}))
+
+
+# Method to check whether the terms of a query occur consecutively in a text
+def contains_phrase(text, query):
+
+	terms, tokens = tokenize(query), tokenize(text)
+	return bool(terms) and any(tokens[i:i + len(terms)] == terms for i in range(len(tokens) - len(terms) + 1))
+
+
+def test_improvement_check_matches_brute_force():
+	generator = random.Random(4)
+	domUns, domSuc = logs(generator, 60, 0), logs(generator, 60, 1000)
+
+	expected = {True: [], False: []}
+	for u in domUns.itertuples():
+		for successful, later in ((True, domSuc), (False, domUns)):
+			for v in later.itertuples():
+				if contains_phrase(v.UserInput, u.UserInput) and pd.notna(u.Timestamp) and pd.notna(v.Timestamp) and v.Timestamp > u.Timestamp:
+					expected[successful].append((u.RowID, v.RowID))
+
+	found, foundneg = task3.improvement_check(domUns, domSuc)
+
+	assert list(zip(found['RowID'], found['RowID2'])) == expected[True]
+	assert list(zip(foundneg['RowID'], foundneg['RowID2'])) == expected[False]
+	assert expected[True] and expected[False]
+	assert list(found.columns[:len(schema.task3_columns)]) == schema.task3_columns
@@ -0,0 +1,47 @@
+import random
+from text_analysis import tokenize, auto_fuzziness, edit_distance
+
+
+# Optimal string alignment distance computed over the full table, without the early exit of edit_distance
+def reference_distance(a, b):
+
+	d = [[0] * (len(b) + 1) for _ in range(len(a) + 1)]
+	for i in range(len(a) + 1):
+		d[i][0] = i
+	for j in range(len(b) + 1):
+		d[0][j] = j
+	for i in range(1, len(a) + 1):
+		for j in range(1, len(b) + 1):
+			cost = 0 if a[i - 1] == b[j - 1] else 1
+			d[i][j] = min(d[i - 1][j] + 1, d[i][j - 1] + 1, d[i - 1][j - 1] + cost)
+			if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+				d[i][j] = min(d[i][j], d[i - 2][j - 2] + 1)
+	return d[len(a)][len(b)]
+
+
+def test_tokenize_lowercases_word_tokens():
+	assert tokenize('Attendance NOT marked, e-mail?') == ['attendance', 'not', 'marked', 'e', 'mail']
+	assert tokenize(None) == []
+	assert tokenize(float('nan')) == []
+
+
+def test_auto_fuzziness_follows_term_length():
+	assert [auto_fuzziness('x' * n) for n in range(1, 8)] == [0, 0, 1, 1, 1, 2, 2]
+
+
+def test_edit_distance_counts_adjacent_transposition_as_one_edit():
+	assert edit_distance('attendance', 'attendance', 2) == 0
+	assert edit_distance('attendance', 'attedance', 2) == 1
+	assert edit_distance('marking', 'makring', 2) == 1
+	assert edit_distance('ab', 'ba', 1) == 1
+	assert edit_distance('ca', 'abc', 3) == 3
+
+
+def test_edit_distance_matches_reference_within_limit():
+	random.seed(7)
+	for _ in range(3000):
+		a = ''.join(random.choice('abc') for _ in range(random.randint(0, 6)))
+		b = ''.join(random.choice('abc') for _ in range(random.randint(0, 6)))
+		limit = random.randint(0, 3)
+		expected = reference_distance(a, b)
+		assert edit_distance(a, b, limit) == (expected if expected <= limit else limit + 1), (a, b, limit)
@@ -0,0 +1,56 @@
+'''
+This Py file is responsible for analysing text the way Elasticsearch does for the queries used in the analysis.
+Three methods are defined below, with their purposes described in comments.
+'''
+
+import re
+
+
+# Word tokens, as split by the standard analyzer
+token_pattern = re.compile(r'\w+')
+
+
+# Method to split text into lowercase tokens, similar to the Elasticsearch standard analyzer
+def tokenize(text):
+
+	if not isinstance(text, str):
+		return []
+
+	return token_pattern.findall(text.lower())
+
+
+# Method to get the edit distance allowed for a term by fuzziness AUTO
+def auto_fuzziness(term):
+
+	if len(term) <= 2:
+		return 0
+	if len(term) <= 5:
+		return 1
+	return 2
+
+
+# Method to get the edit distance of two terms, counting transpositions of adjacent characters as one edit
+# Returns limit + 1 as soon as the distance is known to exceed limit
+def edit_distance(a, b, limit):
+
+	if abs(len(a) - len(b)) > limit:
+		return limit + 1
+	if a == b:
+		return 0
+
+	previous2 = None
+	previous = list(range(len(b) + 1))
+
+	for i in range(1, len(a) + 1):
+		current = [i] + [0] * len(b)
+		for j in range(1, len(b) + 1):
+			cost = 0 if a[i - 1] == b[j - 1] else 1
+			current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+			# Transposition of adjacent characters
+			if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+				current[j] = min(current[j], previous2[j - 2] + 1)
+		if min(current) > limit:
+			return limit + 1
+		previous2, previous = previous, current
+
+	return previous[len(b)] if previous[len(b)] <= limit else limit + 1